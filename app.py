@@ -1,35 +1,31 @@
 import streamlit as st
 
+import io
+from datetime import datetime, timedelta, timezone
+
 import pandas as pd
 
-from database.db import init_db, connect
+from database.db import check_db_connection, init_db, pool_stats
+from database.instrumentation import begin_rerun, render_debug_panel
+from database.importer import detect_format, import_questions
+from database.read_model import get_read_model
 from database.questions_repo import (
     add_question,
+    count_questions,
     delete_all_questions,
     delete_question,
-    list_questions,
-    update_question,
+    list_questions_frame,
+    query_questions,
+    refresh_read_model,
+    search_questions,
+    update_questions_bulk,
 )
 
-from integrations.leetcode import fetch_leetcode_problem_metadata, is_leetcode_problem_url
-
+from integrations.leetcode import fetch_many, get_problem_metadata, is_leetcode_problem_url
+from integrations.leetcode_catalog import find_problem, problem_url
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def _cached_leetcode_metadata(url: str):
-    return fetch_leetcode_problem_metadata(url)
-
-def check_db_connection() -> tuple[bool, str | None]:
-    try:
-        conn = connect()
-        cur = conn.cursor()
-        cur.execute("SELECT 1;")
-        _ = cur.fetchone()
-        cur.close()
-        conn.close()
-        return True, None
-    except Exception as e:
-        return False, str(e)
 
+begin_rerun()
 ok, err = check_db_connection()
 if ok:
     st.sidebar.success("Database connection: OK")
@@ -42,17 +38,18 @@ st.sidebar.divider()
 st.sidebar.caption("built with :heart: by Amir Hossein Farzaneh")
 
 init_db()
+refresh_read_model()
 
 st.title("LeetCode Problems")
 
 with st.form("add_question_form", clear_on_submit=True):
     q = st.text_area(
-        "Paste a LeetCode link (or type a problem)",
+        "Paste a LeetCode link, several links one per line, or type a problem",
         key="question_input",
         height=80,
     )
     difficulty = st.selectbox(
-        "Difficulty",
+        "Difficulty (unknown = use LeetCode's)",
         ["unknown", "easy", "medium", "hard"],
         index=0,
         key="difficulty_input",
@@ -60,57 +57,180 @@ with st.form("add_question_form", clear_on_submit=True):
     submitted = st.form_submit_button("Add")
 
 if submitted:
-    text_to_add = q
-    question_id = None
-    link = None
+    pasted_lines = [line.strip() for line in (q or "").splitlines() if line.strip()]
+    if len(pasted_lines) > 1 and all(is_leetcode_problem_url(line) for line in pasted_lines):
+        with st.spinner(f"Fetching {len(pasted_lines)} problems from LeetCode..."):
+            results = fetch_many(pasted_lines)
+
+        added = 0
+        for result in results:
+            item_difficulty = difficulty
+            if result.ok:
+                text_to_add, question_id = result.metadata.title, result.metadata.problem_id
+                if difficulty == "unknown" and result.metadata.difficulty:
+                    item_difficulty = result.metadata.difficulty
+            else:
+                text_to_add, question_id = result.url, None
+            if add_question(text_to_add, difficulty=item_difficulty, question_id=question_id, link=result.url):
+                added += 1
+
+        st.success(f"Added {added} question(s).")
+        failed = [r for r in results if not r.ok]
+        if failed:
+            st.warning(f"Could not fetch {len(failed)} title(s); saved those links as-is.")
+            with st.expander("Error details"):
+                st.code("\n".join(f"{r.url}: {r.error}" for r in failed))
+    else:
+        text_to_add = q
+        question_id = None
+        link = None
 
-    if is_leetcode_problem_url(q):
+        if is_leetcode_problem_url(q):
+            try:
+                with st.spinner("Fetching problem title from LeetCode..."):
+                    meta = get_problem_metadata(q)
+                text_to_add = meta.title
+                question_id = meta.problem_id
+                link = q.strip()
+                if difficulty == "unknown" and meta.difficulty:
+                    difficulty = meta.difficulty
+
+                if question_id is not None:
+                    st.info(f"Detected LeetCode problem #{question_id}: {text_to_add}")
+                else:
+                    st.info(f"Detected LeetCode title: {text_to_add}")
+            except Exception as e:
+                st.warning("Could not fetch LeetCode title; saving your input as-is.")
+                with st.expander("Error details"):
+                    st.code(str(e))
+        else:
+            try:
+                known = find_problem(title=q)
+            except Exception:
+                known = None
+            if known is not None:
+                text_to_add = known.title
+                question_id = known.frontend_id
+                link = problem_url(known)
+                if difficulty == "unknown" and known.difficulty:
+                    difficulty = known.difficulty
+                st.info(f"Matched LeetCode problem #{question_id}: {text_to_add}")
+
+        if add_question(text_to_add, difficulty=difficulty, question_id=question_id, link=link):
+            st.success("Added.")
+        else:
+            st.error("Please enter a non-empty question.")
+
+with st.expander("Bulk import (CSV / JSONL)"):
+    st.caption("Columns: text (or problem), difficulty, id, link, notes. Rows with an id replace that question.")
+    import_file = st.file_uploader("Import file", type=["csv", "jsonl", "ndjson"], key="import_file")
+    if import_file is not None and st.button("Import", key="import_submit"):
         try:
-            with st.spinner("Fetching problem title from LeetCode..."):
-                meta = _cached_leetcode_metadata(q)
-            text_to_add = meta.title
-            question_id = meta.problem_id
-            link = q.strip()
-
-            if question_id is not None:
-                st.info(f"Detected LeetCode problem #{question_id}: {text_to_add}")
-            else:
-                st.info(f"Detected LeetCode title: {text_to_add}")
+            with st.spinner("Importing..."):
+                result = import_questions(
+                    io.TextIOWrapper(import_file, encoding="utf-8", newline=""),
+                    fmt=detect_format(import_file.name),
+                )
         except Exception as e:
-            st.warning("Could not fetch LeetCode title; saving your input as-is.")
+            st.error("Import failed; nothing was saved.")
             with st.expander("Error details"):
                 st.code(str(e))
+        else:
+            st.success(
+                f"Imported {result.imported} question(s), skipped {result.skipped} "
+                "without text or replaced by a later row with the same id."
+            )
 
-    if add_question(text_to_add, difficulty=difficulty, question_id=question_id, link=link):
-        st.success("Added.")
-    else:
-        st.error("Please enter a non-empty question.")
+LIBRARY_PAGE_SIZE = 50
+LIBRARY_FILTER_LIMIT = 500
+SEARCH_RESULT_LIMIT = 20
+LIBRARY_SORTS = {
+    "Newest first": "newest",
+    "Oldest first": "oldest",
+    "Most due": "most_due",
+    "Least recently reviewed": "least_recently_reviewed",
+    "Most reviewed": "most_reviewed",
+}
 
 st.divider()
-st.subheader(f"Questions Library (Total: {len(list_questions())})")
-rows = list_questions()
-table_rows = [
-    {
-        "id": qid,
-        "problem": text,
-        "difficulty": diff,
-        "date_added": created_at,
-        "link": link,
-        "last_reviewed": last_reviewed,
-        "times_reviewed": times_reviewed,
-        "notes": notes or "",
-    }
-    for qid, text, diff, created_at, link, last_reviewed, times_reviewed, notes in rows
-]
-
-df = pd.DataFrame(table_rows)
-
-# Display timestamps in Pacific time
-for _col in ["date_added", "last_reviewed"]:
-    if _col in df.columns:
-        ts = pd.to_datetime(df[_col], utc=True, errors="coerce")
-        df[_col] = ts.dt.tz_convert("America/Los_Angeles").dt.strftime("%Y-%m-%d %H:%M")
-        df[_col] = df[_col].where(df[_col].notna(), "—")
+read_model = get_read_model()
+total_questions = read_model.count(count_questions)
+st.subheader(f"Questions Library (Total: {total_questions})")
+
+search_query = st.text_input("Search problems and notes", key="library_search", placeholder="e.g. sliding window")
+if search_query.strip():
+    hits = search_questions(search_query, limit=SEARCH_RESULT_LIMIT)
+    if not hits:
+        st.caption("No matches.")
+    for hit in hits:
+        st.markdown(f"**#{hit.question.id}** {hit.question.text} · {hit.question.difficulty}  \n{hit.snippet}")
+
+st.sidebar.divider()
+st.sidebar.subheader("Library filters")
+filter_difficulty = st.sidebar.selectbox(
+    "Difficulty", ["any", "easy", "medium", "hard", "unknown"], key="library_filter_difficulty"
+)
+filter_reviewed = st.sidebar.selectbox("Reviewed", ["any", "never", "at least once"], key="library_filter_reviewed")
+filter_stale_days = st.sidebar.number_input(
+    "Last reviewed over N days ago (0 = off)", min_value=0, step=1, value=0, key="library_filter_stale_days"
+)
+filter_min_reviews = st.sidebar.number_input(
+    "Reviewed at least N times", min_value=0, step=1, value=0, key="library_filter_min_reviews"
+)
+filter_order = st.sidebar.selectbox("Sort by", list(LIBRARY_SORTS), key="library_filter_order")
+
+library_filters = {}
+if filter_difficulty != "any":
+    library_filters["difficulty"] = filter_difficulty
+if filter_reviewed != "any":
+    library_filters["never_reviewed"] = filter_reviewed == "never"
+if filter_stale_days:
+    # Whole hours, so the cached result is reused across reruns.
+    this_hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    library_filters["reviewed_before"] = this_hour - timedelta(days=int(filter_stale_days))
+if filter_min_reviews:
+    library_filters["min_times_reviewed"] = int(filter_min_reviews)
+if LIBRARY_SORTS[filter_order] != "newest":
+    library_filters["order_by"] = LIBRARY_SORTS[filter_order]
+
+if st.session_state.get("_library_filters") != library_filters:
+    # Row positions change with the filters, so pending edits no longer line up.
+    st.session_state["_library_filters"] = library_filters
+    st.session_state["_reset_questions_editor"] = True
+
+if library_filters:
+    page, df = read_model.filtered({**library_filters, "limit": LIBRARY_FILTER_LIMIT}, query_questions)
+    shown_note = f" (first {LIBRARY_FILTER_LIMIT})" if len(page) == LIBRARY_FILTER_LIMIT else ""
+    st.caption(f"{len(page)} matching question(s){shown_note}")
+else:
+    # Keyset cursors: library_page_cursors[i] is the (created_at, id) the i-th page starts after.
+    if "library_page_cursors" not in st.session_state:
+        st.session_state["library_page_cursors"] = [None]
+    page_cursors = st.session_state["library_page_cursors"]
+    page_index = len(page_cursors) - 1
+
+    page, df = read_model.library_page(page_cursors[-1], LIBRARY_PAGE_SIZE, list_questions_frame)
+    if page.empty and page_index > 0:
+        # The page emptied out (e.g. after deletes); fall back to the first page.
+        st.session_state["library_page_cursors"] = page_cursors = [None]
+        page_index = 0
+        page, df = read_model.library_page(None, LIBRARY_PAGE_SIZE, list_questions_frame)
+
+    page_nav_prev, page_nav_label, page_nav_next = st.columns([1, 2, 1])
+    with page_nav_prev:
+        if st.button("← Newer", disabled=page_index == 0, key="library_prev_page"):
+            page_cursors.pop()
+            st.session_state["_reset_questions_editor"] = True
+            st.rerun()
+    with page_nav_label:
+        first_shown = page_index * LIBRARY_PAGE_SIZE + 1 if len(page) else 0
+        st.caption(f"Showing {first_shown}–{page_index * LIBRARY_PAGE_SIZE + len(page)} of {total_questions}")
+    with page_nav_next:
+        has_next = len(page) == LIBRARY_PAGE_SIZE and (page_index + 1) * LIBRARY_PAGE_SIZE < total_questions
+        if st.button("Older →", disabled=not has_next, key="library_next_page"):
+            page_cursors.append(page.attrs["cursor"])
+            st.session_state["_reset_questions_editor"] = True
+            st.rerun()
 
 if st.session_state.get("_reset_questions_editor"):
     st.session_state.pop("questions_editor", None)
@@ -133,7 +253,7 @@ if st.button("Save changes"):
     if not edited_rows:
         st.info("No changes to save.")
     else:
-        changed = 0
+        patches = []
         for row_index, patch in edited_rows.items():
             try:
                 qid = int(df.loc[int(row_index), "id"])
@@ -170,18 +290,17 @@ if st.button("Save changes"):
             if isinstance(new_notes, str):
                 new_notes = new_notes.strip()
 
-            ok = update_question(
-                qid,
-                text=new_problem,
-                difficulty=new_difficulty,
-                link=new_link,
-                notes=new_notes,
-                last_reviewed=new_last_reviewed,
-                times_reviewed=new_times_reviewed,
-            )
-            if ok:
-                changed += 1
-
+            fields = {
+                "text": new_problem,
+                "difficulty": new_difficulty,
+                "link": new_link,
+                "notes": new_notes,
+                "last_reviewed": new_last_reviewed,
+                "times_reviewed": new_times_reviewed,
+            }
+            patches.append((qid, {k: v for k, v in fields.items() if v is not None}))
+
+        changed = sum(update_questions_bulk(patches))
         if changed:
             st.success(f"Saved {changed} change(s).")
             st.session_state["_reset_questions_editor"] = True
@@ -213,4 +332,6 @@ with col2:
             st.warning("Please confirm before deleting all questions.")
         else:
             delete_all_questions()
-            st.success("Deleted all questions.")
\ No newline at end of file
+            st.success("Deleted all questions.")
+
+render_debug_panel(pool_stats(), page="app")
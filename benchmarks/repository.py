@@ -0,0 +1,529 @@
+"""Repository layer and Review pickers at 1k-1M questions, on SQLite and Postgres.
+
+    python -m benchmarks.repository [--sizes 1k,10k,100k,1m] [--backends sqlite,postgres]
+                                    [--repeat 20] [--output results.json]
+
+Each size gets a fresh synthetic bank (see generate_bank) loaded straight into
+the tables, then every repo function and picker is timed. The report is one
+JSON document with p50/p95 latency and peak traced memory per operation, plus
+EXPLAIN checks that the hot queries are served by their indexes. The exit
+status is 1 if any index check fails, so this can gate a CI job.
+
+SQLite banks live in a temporary directory. Postgres runs only when
+QUESTIONBANK_BENCH_DATABASE_URL is set; point it at a scratch database,
+because its questions table is emptied before every size.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from database import questions_repo as repo
+from database.config import get_database_url
+from database.db import connection, init_db
+from database.read_model import get_read_model
+from database.review_log import ReviewEvent
+from scheduling.queue import get_review_queue
+from scheduling.sampler import get_due_sampler
+from scheduling.scoring import pick_due_with_randomness, pick_most_due
+
+DEFAULT_SIZES = "1k,10k,100k,1m"
+LOAD_CHUNK = 50_000
+
+# (name, SQL with {ph} placeholders, params key, index the plan must use).
+# Kept in step with the queries in questions_repo.
+HOT_QUERIES = [
+    (
+        "most_due",
+        "SELECT id FROM questions ORDER BY {next_due_order} LIMIT 10",
+        None,
+        "idx_questions_next_due",
+    ),
+    (
+        "library_first_page",
+        "SELECT id FROM questions ORDER BY created_at DESC, id DESC LIMIT 50",
+        None,
+        "idx_questions_created",
+    ),
+    (
+        "library_deep_page",
+        "SELECT id FROM questions WHERE (created_at, id) < ({ph}, {ph}) ORDER BY created_at DESC, id DESC LIMIT 50",
+        "deep_cursor",
+        "idx_questions_created",
+    ),
+    (
+        "random_bounds",
+        "SELECT (SELECT MIN(id) FROM questions WHERE 1 = 1), (SELECT MAX(id) FROM questions WHERE 1 = 1)",
+        None,
+        "primary key",
+    ),
+    (
+        "random_bounds_by_difficulty",
+        "SELECT (SELECT MIN(id) FROM questions WHERE difficulty = {ph}), "
+        "(SELECT MAX(id) FROM questions WHERE difficulty = {ph})",
+        "difficulty",
+        "idx_questions_difficulty_id",
+    ),
+    (
+        "by_id",
+        "SELECT id FROM questions WHERE id = {ph}",
+        "some_id",
+        "primary key",
+    ),
+    (
+        "changed_since",
+        "SELECT id FROM questions WHERE change_id > {ph} ORDER BY change_id, id",
+        "sync_cursor",
+        "idx_questions_change",
+    ),
+    (
+        "filter_by_difficulty",
+        "SELECT id FROM questions WHERE difficulty = {ph} ORDER BY created_at DESC, id DESC LIMIT 500",
+        "one_difficulty",
+        "idx_questions_difficulty_created",
+    ),
+    (
+        "filter_hard_never_reviewed",
+        "SELECT id FROM questions WHERE difficulty = {ph} AND {never_reviewed} "
+        "ORDER BY created_at DESC, id DESC LIMIT 500",
+        "one_difficulty",
+        "idx_questions_never_reviewed",
+    ),
+    (
+        "filter_least_recently_reviewed",
+        "SELECT id FROM questions WHERE last_reviewed IS NOT NULL ORDER BY {last_reviewed_order} LIMIT 500",
+        None,
+        "idx_questions_last_reviewed",
+    ),
+]
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+def generate_bank(n: int, *, seed: int = 0, now: datetime | None = None):
+    """Yields n question rows: (id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes).
+
+    Shaped like a real bank: added over three years, about a third never
+    reviewed, review counts roughly geometric, and notes mostly empty with a
+    long tail up to a few KB.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    span_s = 3 * 365 * 86400
+    difficulties = ["easy", "medium", "hard", "unknown"]
+    weights = [0.3, 0.5, 0.15, 0.05]
+    filler = "two pointers; watch the off-by-one on the window edge. " * 150
+
+    for qid in range(1, n + 1):
+        created_at = now - timedelta(seconds=rng.randrange(span_s))
+        if rng.random() < 0.35:
+            last_reviewed, times_reviewed = None, 0
+        else:
+            times_reviewed = min(12, int(rng.expovariate(0.45)) + 1)
+            age_s = int((now - created_at).total_seconds())
+            last_reviewed = now - timedelta(seconds=rng.randrange(max(1, age_s)))
+        if rng.random() < 0.5:
+            notes = None
+        else:
+            notes = filler[: min(len(filler), int(rng.lognormvariate(5.5, 1.0)))]
+        yield (
+            qid,
+            f"Problem {qid}: synthetic question title",
+            rng.choices(difficulties, weights)[0],
+            created_at,
+            f"https://leetcode.com/problems/synthetic-{qid}/",
+            last_reviewed,
+            times_reviewed,
+            notes,
+        )
+
+
+def _sqlite_ts(value: datetime | None) -> str | None:
+    # Same text format CURRENT_TIMESTAMP writes.
+    return None if value is None else value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _load_sqlite(rows) -> None:
+    with connection() as conn:
+        conn.execute("DELETE FROM questions")
+        batch = []
+        for row in rows:
+            created_at = _sqlite_ts(row[3])
+            # Last modified when added, so delta syncs only see what the timed writes change.
+            batch.append((*row[:3], created_at, row[4], _sqlite_ts(row[5]), *row[6:], created_at + ".000"))
+            if len(batch) >= LOAD_CHUNK:
+                _insert_sqlite(conn, batch)
+                batch = []
+        _insert_sqlite(conn, batch)
+        conn.execute(
+            f"UPDATE questions SET next_due_at = {repo._NEXT_DUE_AT_SQLITE} WHERE last_reviewed IS NOT NULL"
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+
+
+def _insert_sqlite(conn, batch) -> None:
+    conn.executemany(
+        "INSERT INTO questions(id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes, "
+        "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch,
+    )
+
+
+def _load_postgres(rows) -> None:
+    columns = "id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes, updated_at"
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE TABLE questions, questions_tombstones RESTART IDENTITY")
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            pending = 0
+            for row in rows:
+                writer.writerow((*row, row[3]))
+                pending += 1
+                if pending >= LOAD_CHUNK:
+                    buf.seek(0)
+                    cur.copy_expert(f"COPY questions ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+                    buf.seek(0)
+                    buf.truncate()
+                    pending = 0
+            buf.seek(0)
+            cur.copy_expert(f"COPY questions ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+            cur.execute(
+                f"UPDATE questions SET next_due_at = {repo._NEXT_DUE_AT_POSTGRES} WHERE last_reviewed IS NOT NULL"
+            )
+            cur.execute(
+                "SELECT setval(pg_get_serial_sequence('questions', 'id'), (SELECT COALESCE(MAX(id), 1) FROM questions))"
+            )
+        conn.commit()
+        # VACUUM can't run inside a transaction; refresh stats and the visibility map for index-only scans.
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("VACUUM ANALYZE questions")
+        finally:
+            conn.autocommit = False
+
+
+def _summarize(timings: list[float], peak: int) -> dict:
+    ordered = sorted(timings)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[math.ceil(len(ordered) * 0.95) - 1], 3),
+        "peak_kib": round(peak / 1024, 1),
+        "runs": len(ordered),
+    }
+
+
+def _measure(fn, repeat: int) -> dict:
+    fn()  # warm up pools, statement caches and the page cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _summarize(timings, peak)
+
+
+def _operations(n: int, rng: random.Random) -> list[tuple[str, object, int | None]]:
+    """Returns (name, callable, repeat cap) for every timed operation."""
+
+    def some_id() -> int:
+        return rng.randint(1, n)
+
+    def library_frame_via_tuples():
+        # The pre-columnar path: tuples -> dicts -> DataFrame, then per-column timestamp parsing.
+        df = pd.DataFrame(
+            [{name: getattr(q, name) for name in repo.QUESTION_FRAME_COLUMNS} for q in repo.list_questions()]
+        )
+        for col in ("created_at", "last_reviewed"):
+            df[col] = pd.to_datetime(df[col], utc=True, errors="coerce", format="ISO8601")
+        return df
+
+    def pick_1():
+        rows = repo.get_most_due(1)
+        return rows[0].id if rows else None
+
+    def pick_2():
+        rows = repo.get_most_due(10)
+        return pick_due_with_randomness(
+            [q.id for q in rows], [q.last_reviewed for q in rows], [q.times_reviewed for q in rows], k=10, rng=rng
+        )
+
+    def pick_by_scoring_all():
+        # The pre-index path: pull every review state and score it in NumPy.
+        state = repo.list_review_state()
+        return pick_most_due([r[0] for r in state], [r[1] for r in state], [r[2] for r in state])
+
+    queue = get_review_queue()
+    # The queue is per process; drop whatever an earlier size or backend left in it.
+    queue.mark_stale()
+
+    def rebuild_queue():
+        queue.mark_stale()
+        return queue.peek(repo.list_review_state)
+
+    def queue_pick_2():
+        items = queue.top_k(10, repo.list_review_state)
+        return pick_due_with_randomness(
+            [i.id for i in items], [i.last_reviewed for i in items], [i.times_reviewed for i in items], k=10, rng=rng
+        )
+
+    sampler = get_due_sampler()
+    sampler.mark_stale()
+
+    def rebuild_sampler():
+        sampler.mark_stale()
+        return sampler.sample(repo.list_review_state, rng=rng)
+
+    def review_then_weighted_pick():
+        repo.mark_reviewed(some_id())
+        return sampler.sample(repo.list_review_state, rng=rng)
+
+    def flush_review_batch():
+        for _ in range(50):
+            repo.mark_reviewed(some_id())
+        return repo.flush_reviews()
+
+    def mark_reviewed_sync():
+        # What "sync" durability does per review: one event, one commit.
+        return repo._apply_review_events([ReviewEvent(some_id(), datetime.now(timezone.utc).replace(microsecond=0))])
+
+    def review_then_queue_pick():
+        repo.mark_reviewed(queue.peek(repo.list_review_state).id)
+        return queue.peek(repo.list_review_state)
+
+    sync_cursor = repo.list_questions_since(None).cursor
+    return [
+        ("add_question", lambda: repo.add_question("Benchmark question", "medium"), None),
+        ("get_question_by_id", lambda: repo.get_question_by_id(some_id()), None),
+        ("list_questions_limit_200", lambda: repo.list_questions(limit=200), None),
+        ("list_questions_all", lambda: repo.list_questions(), 3),
+        ("list_questions_page", lambda: repo.list_questions_page(page_size=50), None),
+        ("list_questions_frame_all", lambda: repo.list_questions_frame(), 3),
+        ("library_frame_via_tuples", library_frame_via_tuples, 3),
+        ("list_questions_frame_page", lambda: repo.list_questions_frame(limit=50), None),
+        ("count_questions", repo.count_questions, None),
+        ("get_random_question", lambda: repo.get_random_question(), None),
+        ("get_random_question_hard", lambda: repo.get_random_question("hard"), None),
+        ("get_review_context_missing", lambda: repo.get_review_context(n * 10, "hard"), None),
+        ("update_question", lambda: repo.update_question(some_id(), notes="benchmark edit"), None),
+        ("update_questions_bulk_50", lambda: repo.update_questions_bulk([(some_id(), {"notes": "bulk"}) for _ in range(50)]), None),
+        ("mark_reviewed", lambda: repo.mark_reviewed(some_id()), None),
+        ("mark_reviewed_sync_commit", mark_reviewed_sync, None),
+        ("review_events_batch_50", flush_review_batch, None),
+        ("review_queue_build", rebuild_queue, 3),
+        ("review_queue_pick_1", lambda: queue.peek(repo.list_review_state), None),
+        ("review_queue_pick_2", queue_pick_2, None),
+        ("mark_reviewed_then_queue_pick", review_then_queue_pick, None),
+        ("due_sampler_build", rebuild_sampler, 3),
+        ("due_sampler_pick", lambda: sampler.sample(repo.list_review_state, rng=rng), None),
+        ("due_sampler_pick_cold", lambda: sampler.sample(repo.list_review_state, temperature=0.5, rng=rng), None),
+        ("mark_reviewed_then_weighted_pick", review_then_weighted_pick, None),
+        ("list_questions_since", lambda: repo.list_questions_since(sync_cursor), None),
+        ("search_questions_rare", lambda: repo.search_questions(f"problem {some_id()}"), None),
+        ("search_questions_common", lambda: repo.search_questions("off by one window"), None),
+        (
+            "query_questions_hard_never_reviewed",
+            lambda: repo.query_questions(difficulty="hard", never_reviewed=True),
+            None,
+        ),
+        (
+            "query_questions_least_recently_reviewed",
+            lambda: repo.query_questions(never_reviewed=False, order_by="least_recently_reviewed"),
+            None,
+        ),
+        ("pick_1_most_due", pick_1, None),
+        ("pick_2_due_with_randomness", pick_2, None),
+        ("pick_by_scoring_all", pick_by_scoring_all, 3),
+    ]
+
+
+def _query_params(n: int) -> dict:
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"SELECT created_at, id FROM questions ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET {n // 2}"
+            )
+            deep_cursor = tuple(cur.fetchone() or (None, 0))
+        finally:
+            cur.close()
+    return {
+        "deep_cursor": deep_cursor,
+        "difficulty": ("hard", "hard"),
+        "one_difficulty": ("hard",),
+        "some_id": (max(1, n // 2),),
+        "sync_cursor": (repo.list_questions_since(None).cursor,),
+    }
+
+
+def _plan_sqlite(conn, sql: str, params: tuple) -> tuple[list[str], bool]:
+    """Returns (plan lines, whether it reads the whole table or sorts it)."""
+    details = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+    return details, any(d == "SCAN questions" or "USE TEMP B-TREE" in d for d in details)
+
+
+def _plan_postgres(conn, sql: str, params: tuple) -> tuple[list[str], bool]:
+    with conn.cursor() as cur:
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cur.fetchone()[0][0]["Plan"]
+    conn.rollback()
+
+    details, stack, full_scan = [], [plan], False
+    while stack:
+        node = stack.pop()
+        details.append(" ".join(str(node[k]) for k in ("Node Type", "Relation Name", "Index Name") if k in node))
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == "questions":
+            full_scan = True
+        stack.extend(node.get("Plans", []))
+    return details, full_scan
+
+
+def check_indexes(n: int, postgres: bool) -> list[dict]:
+    """EXPLAINs each HOT_QUERIES entry and checks it uses its index without a full scan or sort."""
+    params = _query_params(n)
+    ph = "%s" if postgres else "?"
+    next_due_order = "next_due_at ASC NULLS FIRST, id" if postgres else "next_due_at, id"
+    last_reviewed_order = "last_reviewed ASC NULLS FIRST, id" if postgres else "last_reviewed, id"
+    never_reviewed = "last_reviewed IS NULL" if postgres else "likelihood(last_reviewed IS NULL, 0.5)"
+    checks = []
+    with connection() as conn:
+        for name, sql, params_key, expected in HOT_QUERIES:
+            sql = sql.format(
+                ph=ph,
+                next_due_order=next_due_order,
+                last_reviewed_order=last_reviewed_order,
+                never_reviewed=never_reviewed,
+            )
+            args = params[params_key] if params_key else ()
+            if postgres:
+                details, full_scan = _plan_postgres(conn, sql, args)
+                needle = "questions_pkey" if expected == "primary key" else expected
+            else:
+                details, full_scan = _plan_sqlite(conn, sql, args)
+                # Rowid seeks read "SEARCH questions", with "USING INTEGER PRIMARY KEY" only for equality.
+                needle = "SEARCH questions" if expected == "primary key" else expected
+            checks.append(
+                {
+                    "query": name,
+                    "expected_index": expected,
+                    "ok": any(needle in d for d in details) and not full_scan,
+                    "plan": details,
+                }
+            )
+    return checks
+
+
+def run_size(backend: str, n: int, *, repeat: int, seed: int) -> dict:
+    postgres = backend == "postgres"
+    init_db()
+    start = time.perf_counter()
+    (_load_postgres if postgres else _load_sqlite)(generate_bank(n, seed=seed))
+    load_s = time.perf_counter() - start
+    # The bulk load bypasses the repository's change hooks, so drop what the previous size cached.
+    get_read_model().invalidate()
+    get_review_queue().mark_stale()
+    get_due_sampler().mark_stale()
+
+    # Index checks run on the freshly loaded bank, before the timed writes touch it.
+    index_checks = check_indexes(n, postgres)
+
+    random.seed(seed)  # get_random_question draws from the module-level generator
+    rng = random.Random(seed)
+    ops = {}
+    for name, fn, cap in _operations(n, rng):
+        ops[name] = _measure(fn, min(repeat, cap) if cap else repeat)
+    # Queued reviews belong to this bank; commit them before the next one is loaded.
+    repo.flush_reviews()
+    return {
+        "backend": backend,
+        "size": n,
+        "load_s": round(load_s, 2),
+        "operations": ops,
+        "index_checks": index_checks,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma separated, default {DEFAULT_SIZES}")
+    parser.add_argument(
+        "--backends",
+        default=None,
+        help="comma separated; defaults to sqlite, plus postgres if QUESTIONBANK_BENCH_DATABASE_URL is set",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    bench_url = os.getenv("QUESTIONBANK_BENCH_DATABASE_URL")
+    backends = (args.backends or ("sqlite,postgres" if bench_url else "sqlite")).split(",")
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="questionbank-bench-") as tmp:
+        for backend in backends:
+            backend = backend.strip()
+            if backend == "postgres":
+                if not bench_url:
+                    parser.error("postgres needs QUESTIONBANK_BENCH_DATABASE_URL")
+                os.environ["DATABASE_URL"] = bench_url
+            elif backend == "sqlite":
+                os.environ.pop("DATABASE_URL", None)
+            else:
+                parser.error(f"unknown backend {backend!r}")
+            # Streamlit secrets take precedence over the environment; refuse to benchmark the wrong database.
+            if get_database_url() != (bench_url if backend == "postgres" else None):
+                parser.error("DATABASE_URL is set in .streamlit/secrets.toml; run from a directory without it")
+
+            for n in sizes:
+                os.environ["QUESTIONBANK_DB_PATH"] = str(Path(tmp) / f"bench-{n}.db")
+                result = run_size(backend, n, repeat=args.repeat, seed=args.seed)
+                results.append(result)
+                print(f"{backend} {n}: loaded in {result['load_s']}s", file=sys.stderr)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+    failed = [(r["backend"], r["size"], c["query"]) for r in results for c in r["index_checks"] if not c["ok"]]
+    for backend, n, query in failed:
+        print(f"index check failed: {backend} {n} {query}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+"""Streaming title scanner vs. the old full BeautifulSoup parse.
+
+    python -m benchmarks.title_extraction [saved_page.html ...] [--repeat 20]
+
+With no files, a synthetic page shaped like a LeetCode problem page is used
+(title and og:title in <head>, followed by a few hundred KB of inline script).
+The baseline needs beautifulsoup4, which the app itself no longer depends on;
+install it with `pip install -r requirements-dev.txt`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from integrations.leetcode import _extract_title_from_chunks
+
+CHUNK_SIZE = 8192  # what _fetch_via_html asks requests for
+
+
+def synthetic_page(body_kb: int = 400) -> bytes:
+    head = (
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'>"
+        + "".join(f"<link rel='preload' href='/_next/static/chunks/{i}.js' as='script'/>" for i in range(40))
+        + "<title>1. Two Sum - LeetCode</title>"
+        + "<meta property='og:title' content='1. Two Sum - LeetCode'/>"
+        + "<meta name='description' content='Can you solve this real interview question?'/>"
+        + "</head>"
+    )
+    blob = json.dumps({"props": {"pageProps": {"dehydratedState": ["x" * 120] * (body_kb * 8)}}})
+    body = f"<body><div id='__next'></div><script id='__NEXT_DATA__' type='application/json'>{blob}</script></body></html>"
+    return (head + body).encode("utf-8")
+
+
+def _chunks(page: bytes):
+    for i in range(0, len(page), CHUNK_SIZE):
+        yield page[i : i + CHUNK_SIZE]
+
+
+def _bs4_title(page: bytes) -> str | None:
+    from bs4 import BeautifulSoup
+
+    # Old path: resp.text holds the whole page, then a full parse tree is built.
+    soup = BeautifulSoup(page.decode("utf-8"), "html.parser")
+    og = soup.find("meta", attrs={"property": "og:title"})
+    if og and og.get("content"):
+        return str(og.get("content")).strip()
+    if soup.title and soup.title.string:
+        return str(soup.title.string).strip()
+    return None
+
+
+def _streaming_title(page: bytes) -> str | None:
+    return _extract_title_from_chunks(_chunks(page), "utf-8")
+
+
+def _measure(fn, page: bytes, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(page)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    title = fn(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "title": title,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(sorted(timings)[math.ceil(len(timings) * 0.95) - 1], 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="saved problem pages (.html)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    fixtures = [(p, Path(p).read_bytes()) for p in args.pages] or [("synthetic", synthetic_page())]
+    for name, page in fixtures:
+        report = {"page": name, "bytes": len(page), "streaming": _measure(_streaming_title, page, args.repeat)}
+        try:
+            report["beautifulsoup"] = _measure(_bs4_title, page, args.repeat)
+        except ImportError:
+            report["beautifulsoup"] = "skipped: pip install -r requirements-dev.txt"
+        print(json.dumps(report))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,8 +3,55 @@ import streamlit as st
 
 def get_database_url() -> str | None:
     # Prefer Streamlit Secrets (Cloud + local secrets.toml), fallback to env var
-    return st.secrets.get("DATABASE_URL") or os.getenv("DATABASE_URL")
+    try:
+        from_secrets = st.secrets.get("DATABASE_URL")
+    except FileNotFoundError:
+        # No secrets.toml at all, e.g. when running a CLI entry point.
+        from_secrets = None
+    return from_secrets or os.getenv("DATABASE_URL")
 
 def get_db_path() -> str:
     # Still useful as a local fallback if DATABASE_URL is not set
-    return os.getenv("QUESTIONBANK_DB_PATH", "questions.db")
\ No newline at end of file
+    return os.getenv("QUESTIONBANK_DB_PATH", "questions.db")
+
+def get_pool_min_size() -> int:
+    # Postgres connections opened up front and kept idle between checkouts
+    return max(0, int(os.getenv("QUESTIONBANK_POOL_MIN", "1")))
+
+def get_pool_max_size() -> int:
+    # Hard cap per process; keep below the server's max_connections / replicas
+    return max(1, int(os.getenv("QUESTIONBANK_POOL_MAX", "10")))
+
+def get_pool_timeout() -> float:
+    # Seconds a checkout waits for a free connection before giving up
+    return float(os.getenv("QUESTIONBANK_POOL_TIMEOUT", "10"))
+
+def get_pool_health_check_interval() -> float:
+    # Idle connections older than this are pinged with SELECT 1 on checkout
+    return float(os.getenv("QUESTIONBANK_POOL_HEALTH_CHECK_S", "30"))
+
+def get_sync_interval() -> float:
+    # Seconds between delta syncs of the in-memory read model; 0 syncs on every rerun
+    return max(0.0, float(os.getenv("QUESTIONBANK_SYNC_INTERVAL_S", "15")))
+
+def get_query_debug_enabled() -> bool:
+    # Record every statement per rerun and show them in a sidebar panel
+    return os.getenv("QUESTIONBANK_QUERY_DEBUG", "").strip().lower() in {"1", "true", "yes", "on"}
+
+def get_review_durability() -> str:
+    # "batch": reviews are queued and committed in batches off the request path;
+    # "sync": each review commits before mark_reviewed() returns
+    value = os.getenv("QUESTIONBANK_REVIEW_DURABILITY", "batch").strip().lower()
+    return value if value in {"batch", "sync"} else "batch"
+
+def get_review_batch_size() -> int:
+    # Queued reviews that trigger a flush without waiting for the interval
+    return max(1, int(os.getenv("QUESTIONBANK_REVIEW_BATCH_SIZE", "50")))
+
+def get_review_flush_interval_ms() -> float:
+    # Longest a queued review waits before it is committed
+    return max(1.0, float(os.getenv("QUESTIONBANK_REVIEW_FLUSH_MS", "250")))
+
+def get_review_max_pending() -> int:
+    # Queued reviews past which mark_reviewed() writes synchronously instead of queueing
+    return max(1, int(os.getenv("QUESTIONBANK_REVIEW_MAX_PENDING", "1000")))
@@ -1,130 +1,302 @@
 import sqlite3
-from .config import get_database_url, get_db_path
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import (
+    get_database_url,
+    get_db_path,
+    get_pool_health_check_interval,
+    get_pool_max_size,
+    get_pool_min_size,
+    get_pool_timeout,
+    get_query_debug_enabled,
+)
 
 def _is_postgres() -> bool:
     return bool(get_database_url())
 
 def connect():
+    """Opens a new, unpooled connection. Prefer `connection()` in app code.
+
+    With QUESTIONBANK_QUERY_DEBUG on, cursors time every statement into the
+    current rerun's collector (see database.instrumentation).
+    """
+    debug = get_query_debug_enabled()
     if _is_postgres():
         import psycopg2
+        if debug:
+            from .instrumentation import postgres_cursor_factory
+            return psycopg2.connect(get_database_url(), cursor_factory=postgres_cursor_factory())
         return psycopg2.connect(get_database_url())
+    if debug:
+        from .instrumentation import InstrumentedSQLiteConnection
+        return sqlite3.connect(get_db_path(), factory=InstrumentedSQLiteConnection)
     return sqlite3.connect(get_db_path())
 
 
-def _sqlite_has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
-    rows = conn.execute(f"PRAGMA table_info({table});").fetchall()
-    return any(r[1] == column for r in rows)
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection becomes free within the checkout timeout."""
 
-def init_db() -> None:
-    if _is_postgres():
-        with connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS questions (
-                        id SERIAL PRIMARY KEY,
-                        text TEXT NOT NULL,
-                        difficulty TEXT NOT NULL DEFAULT 'unknown'
-                        ,created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                        ,last_reviewed TIMESTAMPTZ
-                        ,times_reviewed INTEGER NOT NULL DEFAULT 0
-                        ,link TEXT
-                        ,notes TEXT
+
+class _PostgresPool:
+    """Process-wide, thread-safe psycopg2 connection pool.
+
+    Checkouts reuse idle connections (LIFO, so the warmest one goes first) and
+    only open a new one while fewer than `max_size` exist; otherwise they wait.
+    """
+
+    def __init__(self, *, min_size: int, max_size: int, timeout_s: float, health_check_s: float):
+        self._max_size = max(1, max_size)
+        self._timeout_s = timeout_s
+        self._health_check_s = health_check_s
+        self._idle: list[tuple[object, float]] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self.stats = {"hits": 0, "waits": 0, "opens": 0, "discards": 0}
+
+        for _ in range(min(min_size, self._max_size)):
+            self._idle.append((connect(), time.monotonic()))
+            self._size += 1
+            self.stats["opens"] += 1
+
+    def _reserve(self):
+        """Returns (idle_conn, idle_since) or (None, None) when the caller should open one."""
+        deadline = time.monotonic() + self._timeout_s
+        with self._cond:
+            waited = False
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self._max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No database connection free after {self._timeout_s:.1f}s "
+                        f"(pool size {self._max_size})"
                     )
-                    """
-                )
-                cur.execute(
-                    """
-                    ALTER TABLE questions
-                    ADD COLUMN IF NOT EXISTS difficulty TEXT NOT NULL DEFAULT 'unknown'
-                    """
-                )
-                cur.execute(
-                    """
-                    ALTER TABLE questions
-                    ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-                    """
-                )
-                cur.execute(
-                    """
-                    ALTER TABLE questions
-                    ADD COLUMN IF NOT EXISTS link TEXT
-                    """
-                )
-                cur.execute(
-                    """
-                    ALTER TABLE questions
-                    ADD COLUMN IF NOT EXISTS last_reviewed TIMESTAMPTZ
-                    """
-                )
-                cur.execute(
-                    """
-                    ALTER TABLE questions
-                    ADD COLUMN IF NOT EXISTS times_reviewed INTEGER NOT NULL DEFAULT 0
-                    """
-                )
-                cur.execute(
-                    """
-                    ALTER TABLE questions
-                    ADD COLUMN IF NOT EXISTS notes TEXT
-                    """
-                )
-                cur.execute(
-                    """
-                    UPDATE questions
-                    SET difficulty = 'unknown'
-                    WHERE difficulty IS NULL
-                    """
-                )
-                cur.execute(
-                    """
-                    UPDATE questions
-                    SET times_reviewed = 0
-                    WHERE times_reviewed IS NULL
-                    """
-                )
-            conn.commit()
-    else:
-        with connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS questions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    text TEXT NOT NULL,
-                    difficulty TEXT NOT NULL DEFAULT 'unknown'
-                    ,created_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)
-                    ,last_reviewed TEXT
-                    ,times_reviewed INTEGER NOT NULL DEFAULT 0
-                    ,link TEXT
-                    ,notes TEXT
-                )
-                """
-            )
-            if not _sqlite_has_column(conn, "questions", "difficulty"):
-                conn.execute(
-                    "ALTER TABLE questions ADD COLUMN difficulty TEXT NOT NULL DEFAULT 'unknown'"
-                )
-            if not _sqlite_has_column(conn, "questions", "created_at"):
-                conn.execute(
-                    "ALTER TABLE questions ADD COLUMN created_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)"
-                )
-            if not _sqlite_has_column(conn, "questions", "link"):
-                conn.execute(
-                    "ALTER TABLE questions ADD COLUMN link TEXT"
-                )
-            if not _sqlite_has_column(conn, "questions", "last_reviewed"):
-                conn.execute(
-                    "ALTER TABLE questions ADD COLUMN last_reviewed TEXT"
-                )
-            if not _sqlite_has_column(conn, "questions", "times_reviewed"):
-                conn.execute(
-                    "ALTER TABLE questions ADD COLUMN times_reviewed INTEGER NOT NULL DEFAULT 0"
-                )
-            if not _sqlite_has_column(conn, "questions", "notes"):
-                conn.execute(
-                    "ALTER TABLE questions ADD COLUMN notes TEXT"
-                )
-            conn.execute(
-                "UPDATE questions SET times_reviewed = 0 WHERE times_reviewed IS NULL"
+                if not waited:
+                    waited = True
+                    self.stats["waits"] += 1
+                self._cond.wait(remaining)
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self._health_check_s:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self):
+        while True:
+            conn, idle_since = self._reserve()
+            if conn is None:
+                try:
+                    conn = connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                self.stats["opens"] += 1
+                return conn
+
+            if self._is_healthy(conn, idle_since):
+                self.stats["hits"] += 1
+                return conn
+
+            self._discard(conn)
+
+    def _discard(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.stats["discards"] += 1
+        self._release_slot()
+
+    def putconn(self, conn) -> None:
+        if not conn.closed:
+            try:
+                # End any transaction left open by a read-only caller.
+                conn.rollback()
+            except Exception:
+                pass
+        if conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {**self.stats, "size": self._size, "idle": len(self._idle), "max_size": self._max_size}
+
+
+class _SQLiteConnections:
+    """One reusable SQLite connection per thread and database file.
+
+    A nested checkout on the same thread gets a private connection instead, so an
+    inner commit never ends the outer caller's transaction.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "waits": 0, "opens": 0, "discards": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def getconn(self, path: str):
+        slots = getattr(self._local, "slots", None)
+        if slots is None:
+            slots = self._local.slots = {}
+
+        slot = slots.get(path)
+        if slot is not None and not slot["busy"]:
+            try:
+                # Raises ProgrammingError if someone closed the connection.
+                slot["conn"].total_changes
+            except sqlite3.ProgrammingError:
+                del slots[path]
+                slot = None
+                self._count("discards")
+            else:
+                slot["busy"] = True
+                self._count("hits")
+                return slot["conn"], True
+
+        conn = connect()
+        self._count("opens")
+        if slot is None:
+            slots[path] = {"conn": conn, "busy": True}
+            return conn, True
+        return conn, False
+
+    def putconn(self, path: str, conn, *, shared: bool) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        if shared:
+            self._local.slots[path]["busy"] = False
+        else:
+            conn.close()
+            self._count("discards")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+_pools: dict[str, _PostgresPool] = {}
+_pools_lock = threading.Lock()
+_sqlite_connections = _SQLiteConnections()
+
+
+def _get_postgres_pool() -> _PostgresPool:
+    url = get_database_url()
+    pool = _pools.get(url)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _PostgresPool(
+                min_size=get_pool_min_size(),
+                max_size=get_pool_max_size(),
+                timeout_s=get_pool_timeout(),
+                health_check_s=get_pool_health_check_interval(),
             )
-            conn.commit()
\ No newline at end of file
+            _pools[url] = pool
+        return pool
+
+
+@contextmanager
+def connection():
+    """Checks out a pooled connection for the duration of the block.
+
+    Callers commit explicitly; anything left uncommitted is rolled back when the
+    connection goes back to the pool.
+    """
+    if _is_postgres():
+        pool = _get_postgres_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn)
+        return
+
+    path = get_db_path()
+    conn, shared = _sqlite_connections.getconn(path)
+    try:
+        yield conn
+    finally:
+        _sqlite_connections.putconn(path, conn, shared=shared)
+
+
+# SQLite's default limit on bound parameters is 999 on older builds.
+_IN_CHUNK_SIZE = 500
+
+
+def in_chunks(values: list, placeholder: str):
+    """Splits `values` for `IN (...)` lists: yields (placeholders, chunk) pairs under the bound-parameter limit."""
+    for i in range(0, len(values), _IN_CHUNK_SIZE):
+        chunk = values[i : i + _IN_CHUNK_SIZE]
+        yield ", ".join([placeholder] * len(chunk)), chunk
+
+
+def pool_stats() -> dict:
+    """Checkout counters for the active backend: hits, waits, opens, discards."""
+    if _is_postgres():
+        return {"backend": "postgres", **_get_postgres_pool().snapshot()}
+    return {"backend": "sqlite", **_sqlite_connections.snapshot()}
+
+
+_HEALTH_CHECK_TTL_S = 30.0
+_health_cache: dict[str, tuple[float, tuple[bool, str | None]]] = {}
+
+
+def check_db_connection(*, ttl_s: float = _HEALTH_CHECK_TTL_S) -> tuple[bool, str | None]:
+    """Round-trips SELECT 1, reusing the last result for `ttl_s` seconds per process.
+
+    Failures are not cached, so the sidebar recovers on the next rerun.
+    """
+    target = get_database_url() or get_db_path()
+    cached = _health_cache.get(target)
+    if cached is not None and time.monotonic() - cached[0] < ttl_s:
+        return cached[1]
+
+    try:
+        with connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            _ = cur.fetchone()
+            cur.close()
+    except Exception as e:
+        _health_cache.pop(target, None)
+        return False, str(e)
+
+    _health_cache[target] = (time.monotonic(), (True, None))
+    return True, None
+
+
+def init_db() -> None:
+    """Applies pending schema migrations; a no-op after the first call per process."""
+    from .migrations import migrate
+
+    migrate()
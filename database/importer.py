@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+
+from .db import _is_postgres, connection, init_db
+from .questions_repo import (
+    _CHANGE_ID_SQLITE,
+    _NOW_SQLITE,
+    _bump_change_clock,
+    _normalize_new_question,
+    _questions_changed,
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    imported: int
+    skipped: int
+
+
+def detect_format(filename: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def iter_records(stream: TextIO, fmt: str = "csv") -> Iterator[dict]:
+    """Yields one dict per CSV row or JSON line, without reading the whole file."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    if fmt != "jsonl":
+        raise ValueError(f"Unsupported import format: {fmt!r}")
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_no}: invalid JSON ({e.msg})") from e
+        if isinstance(record, dict):
+            yield record
+
+
+def _clean(record: dict) -> tuple | None:
+    # Accept the library table's "problem" header as well as "text".
+    text = record.get("text")
+    if text is None:
+        text = record.get("problem")
+    notes = record.get("notes")
+    return _normalize_new_question(
+        str(text or ""),
+        str(record.get("difficulty") or "unknown"),
+        question_id=record.get("id") or None,
+        link=record.get("link") or None,
+        notes=None if notes in (None, "") else str(notes),
+    )
+
+
+def _chunks(records: Iterable[dict], chunk_size: int) -> Iterator[tuple[list[tuple], list[tuple], int]]:
+    """Yields (rows with id, rows without id, skipped) per chunk of cleaned records.
+
+    A repeated id within a chunk keeps its last occurrence, like sequential upserts
+    would; the earlier occurrences count as skipped.
+    """
+    it = iter(records)
+    while True:
+        batch = list(islice(it, chunk_size))
+        if not batch:
+            return
+        with_id: dict[int, tuple] = {}
+        without_id: list[tuple] = []
+        skipped = 0
+        for record in batch:
+            row = _clean(record)
+            if row is None:
+                skipped += 1
+            elif row[0] is None:
+                without_id.append(row[1:])
+            else:
+                if row[0] in with_id:
+                    skipped += 1
+                with_id[row[0]] = row
+        yield list(with_id.values()), without_id, skipped
+
+
+def _import_sqlite(chunks) -> ImportResult:
+    imported = skipped = 0
+    with connection() as conn:
+        _bump_change_clock(conn)
+        for with_id, without_id, chunk_skipped in chunks:
+            conn.executemany(
+                f"""
+                INSERT INTO questions(id, text, difficulty, link, notes, updated_at, change_id)
+                VALUES (?, ?, ?, ?, ?, {_NOW_SQLITE}, {_CHANGE_ID_SQLITE})
+                ON CONFLICT(id) DO UPDATE SET
+                    text = excluded.text, difficulty = excluded.difficulty, link = excluded.link,
+                    notes = excluded.notes, updated_at = excluded.updated_at, change_id = excluded.change_id
+                """,
+                with_id,
+            )
+            conn.executemany(
+                "INSERT INTO questions(text, difficulty, link, notes, updated_at, change_id) "
+                f"VALUES (?, ?, ?, ?, {_NOW_SQLITE}, {_CHANGE_ID_SQLITE})",
+                without_id,
+            )
+            imported += len(with_id) + len(without_id)
+            skipped += chunk_skipped
+        conn.commit()
+    return ImportResult(imported=imported, skipped=skipped)
+
+
+def _import_postgres(chunks) -> ImportResult:
+    imported = skipped = 0
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TEMP TABLE questions_import (
+                    id INTEGER, text TEXT, difficulty TEXT, link TEXT, notes TEXT
+                ) ON COMMIT DROP
+                """
+            )
+            for with_id, without_id, chunk_skipped in chunks:
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerows(with_id)
+                writer.writerows((None, *row) for row in without_id)
+                buf.seek(0)
+                cur.copy_expert(
+                    "COPY questions_import (id, text, difficulty, link, notes) FROM STDIN WITH (FORMAT csv)",
+                    buf,
+                )
+                cur.execute(
+                    """
+                    INSERT INTO questions(id, text, difficulty, link, notes)
+                    SELECT id, text, difficulty, link, notes FROM questions_import WHERE id IS NOT NULL
+                    ON CONFLICT (id) DO UPDATE SET
+                        text = EXCLUDED.text, difficulty = EXCLUDED.difficulty,
+                        link = EXCLUDED.link, notes = EXCLUDED.notes, updated_at = NOW(),
+                        change_id = EXCLUDED.change_id
+                    """
+                )
+                # Rows without an id stay staged until the sequence is past every explicit id.
+                cur.execute("DELETE FROM questions_import WHERE id IS NOT NULL")
+                imported += len(with_id) + len(without_id)
+                skipped += chunk_skipped
+
+            cur.execute(
+                """
+                SELECT setval(
+                    pg_get_serial_sequence('questions', 'id'),
+                    (SELECT COALESCE(MAX(id), 1) FROM questions)
+                )
+                """
+            )
+            cur.execute(
+                """
+                INSERT INTO questions(text, difficulty, link, notes)
+                SELECT text, difficulty, link, notes FROM questions_import
+                """
+            )
+        conn.commit()
+    return ImportResult(imported=imported, skipped=skipped)
+
+
+def import_questions(stream: TextIO, *, fmt: str = "csv", chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportResult:
+    """Streams questions from a CSV/JSONL text stream into the bank in one transaction.
+
+    Records are normalized like add_question() and read `chunk_size` at a time,
+    so memory stays bounded. Postgres loads through COPY into a staging table,
+    SQLite through executemany. Rows with an id are upserted.
+    """
+    init_db()
+    chunks = _chunks(iter_records(stream, fmt), max(1, int(chunk_size)))
+    if _is_postgres():
+        result = _import_postgres(chunks)
+    else:
+        result = _import_sqlite(chunks)
+    _questions_changed()
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m database.importer",
+        description="Import questions from a CSV or JSON Lines file.",
+    )
+    parser.add_argument("path", help="CSV or JSONL file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if args.path == "-":
+        result = import_questions(sys.stdin, fmt=fmt, chunk_size=args.chunk_size)
+    else:
+        with open(args.path, encoding="utf-8", newline="") as f:
+            result = import_questions(f, fmt=fmt, chunk_size=args.chunk_size)
+
+    print(f"Imported {result.imported} question(s), skipped {result.skipped}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
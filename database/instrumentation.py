@@ -0,0 +1,248 @@
+import functools
+import json
+import re
+import sqlite3
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+import streamlit as st
+
+from .config import get_query_debug_enabled
+
+
+@dataclass
+class QueryRecord:
+    fingerprint: str
+    params: int
+    rows: int
+    duration_ms: float
+    started_at: float  # epoch seconds
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+# One value once literals are replaced: ?, a signed or E'' one, or a keyword, with an optional cast.
+_VALUE = r"(?:-?E?\?|NULL|TRUE|FALSE|DEFAULT)(?:::\w+(?:\[\])?)?"
+_VALUES_TUPLE = rf"\(\s*{_VALUE}(?:\s*,\s*{_VALUE})*\s*\)"
+_IN_LIST = re.compile(rf"\bIN\s*{_VALUES_TUPLE}", re.IGNORECASE)
+_VALUES_LIST = re.compile(rf"\bVALUES\s*{_VALUES_TUPLE}(?:\s*,\s*{_VALUES_TUPLE})*", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalizes SQL so the same statement groups together whatever its values.
+
+    Literals and placeholders become ?, IN lists and VALUES rows collapse to
+    `...` whatever their length, width or casts, and whitespace is squeezed.
+    So batches of different sizes share one fingerprint:
+
+    >>> fingerprint("INSERT INTO t(a, b) VALUES (%s::int, %s::text)")
+    'INSERT INTO t(a, b) VALUES (...), ...'
+    >>> fingerprint("INSERT INTO t(a, b) VALUES (1::int, 'x'::text),(2::int, NULL::text)")
+    'INSERT INTO t(a, b) VALUES (...), ...'
+    >>> fingerprint("SELECT id FROM t WHERE id IN (?)") == fingerprint("SELECT id FROM t WHERE id IN (?, ?, ?)")
+    True
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES_LIST.sub("VALUES (...), ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _count_params(params) -> int:
+    if params is None:
+        return 0
+    try:
+        return len(params)
+    except TypeError:
+        return 1
+
+
+class QueryCollector:
+    """Statements recorded during one page rerun."""
+
+    def __init__(self):
+        self.records: list[QueryRecord] = []
+
+    def total_ms(self) -> float:
+        return sum(r.duration_ms for r in self.records)
+
+    def slowest(self, n: int = 10) -> list[QueryRecord]:
+        return sorted(self.records, key=lambda r: r.duration_ms, reverse=True)[:n]
+
+    def by_fingerprint(self) -> list[dict]:
+        """Per-statement totals, most total time first."""
+        groups: dict[str, dict] = {}
+        for r in self.records:
+            g = groups.setdefault(r.fingerprint, {"fingerprint": r.fingerprint, "calls": 0, "rows": 0, "total_ms": 0.0})
+            g["calls"] += 1
+            g["rows"] += r.rows
+            g["total_ms"] += r.duration_ms
+        return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+
+    def to_jsonl(self, **context) -> str:
+        """One JSON object per statement; `context` (e.g. page=...) is added to each."""
+        return "".join(json.dumps({**context, **asdict(r)}) + "\n" for r in self.records)
+
+
+_collector: ContextVar[QueryCollector | None] = ContextVar("questionbank_query_collector", default=None)
+
+
+def begin_rerun() -> QueryCollector | None:
+    """Starts a fresh collector for this script run, if query debugging is on."""
+    if not get_query_debug_enabled():
+        return None
+    collector = QueryCollector()
+    _collector.set(collector)
+    return collector
+
+
+def current_collector() -> QueryCollector | None:
+    return _collector.get()
+
+
+class _Timed:
+    """Shared bookkeeping for the instrumented cursors below."""
+
+    _record: QueryRecord | None = None
+
+    def _begin(self) -> float:
+        self._record = None
+        return time.perf_counter()
+
+    def _end(self, sql, params, start: float, rowcount: int) -> None:
+        collector = _collector.get()
+        if collector is None:
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        sql = sql.decode() if isinstance(sql, bytes) else str(sql)
+        self._record = QueryRecord(
+            fingerprint=fingerprint(sql),
+            params=params,
+            rows=max(0, rowcount),
+            duration_ms=elapsed,
+            started_at=time.time() - elapsed / 1000,
+        )
+        collector.records.append(self._record)
+
+    def _fetched(self, start: float, rows: int) -> None:
+        # SELECTs do most of their work while rows are fetched, so fetch time counts too.
+        if self._record is not None:
+            self._record.duration_ms += (time.perf_counter() - start) * 1000
+            self._record.rows += rows
+
+
+class InstrumentedSQLiteCursor(_Timed, sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = self._begin()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._end(sql, _count_params(parameters), start, self.rowcount)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        start = self._begin()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._end(sql, sum(_count_params(p) for p in seq_of_parameters), start, self.rowcount)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+
+class InstrumentedSQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors record into the current collector."""
+
+    def cursor(self, factory=InstrumentedSQLiteCursor):
+        return super().cursor(factory)
+
+    # The built-in shortcuts execute on a cursor without going through its Python methods.
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+@functools.cache
+def postgres_cursor_factory():
+    """Returns a psycopg2 cursor class that records into the current collector."""
+    import psycopg2.extensions
+
+    class InstrumentedPostgresCursor(_Timed, psycopg2.extensions.cursor):
+        def execute(self, query, vars=None):
+            start = self._begin()
+            try:
+                return super().execute(query, vars)
+            finally:
+                # psycopg2 fetches results eagerly, so rowcount already covers SELECTs.
+                self._end(query, _count_params(vars), start, self.rowcount)
+
+        def executemany(self, query, vars_list):
+            vars_list = list(vars_list)
+            start = self._begin()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                self._end(query, sum(_count_params(v) for v in vars_list), start, self.rowcount)
+
+        def copy_expert(self, sql, file, size=8192):
+            start = self._begin()
+            try:
+                return super().copy_expert(sql, file, size)
+            finally:
+                self._end(sql, 0, start, self.rowcount)
+
+    return InstrumentedPostgresCursor
+
+
+def render_debug_panel(pool: dict | None = None, *, page: str = "app") -> None:
+    """Sidebar summary of this rerun's queries; no-op unless query debugging is on."""
+    collector = _collector.get()
+    if collector is None:
+        return
+
+    with st.sidebar.expander(f"Queries: {len(collector.records)} in {collector.total_ms():.1f} ms"):
+        if pool:
+            st.caption(" · ".join(f"{k}: {v}" for k, v in pool.items()))
+        st.markdown("**By statement**")
+        st.dataframe(
+            [
+                {"calls": g["calls"], "rows": g["rows"], "ms": round(g["total_ms"], 2), "sql": g["fingerprint"]}
+                for g in collector.by_fingerprint()
+            ],
+            hide_index=True,
+        )
+        st.markdown("**Slowest**")
+        st.dataframe(
+            [{"ms": round(r.duration_ms, 2), "rows": r.rows, "sql": r.fingerprint} for r in collector.slowest()],
+            hide_index=True,
+        )
+        st.download_button(
+            "Export JSONL",
+            collector.to_jsonl(page=page),
+            file_name=f"queries-{page}-{int(time.time())}.jsonl",
+            mime="application/x-ndjson",
+            key=f"query_debug_export_{page}",
+        )
@@ -0,0 +1,201 @@
+from .config import get_database_url
+from .db import connection, in_chunks
+
+
+def _is_postgres() -> bool:
+    return bool(get_database_url())
+
+
+def get_cached_metadata_many(slugs: list[str]) -> dict[str, tuple]:
+    """Returns {slug: (problem_id, title, difficulty, found, fetched_at)} for cached slugs.
+
+    `fetched_at` is epoch seconds; expiry is up to the caller.
+    """
+    slugs = list(dict.fromkeys(s for s in slugs if s))
+    if not slugs:
+        return {}
+
+    found: dict[str, tuple] = {}
+    ph = "%s" if _is_postgres() else "?"
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            for marks, chunk in in_chunks(slugs, ph):
+                cur.execute(
+                    "SELECT slug, problem_id, title, difficulty, found, fetched_at FROM leetcode_metadata_cache "
+                    f"WHERE slug IN ({marks})",
+                    tuple(chunk),
+                )
+                for slug, problem_id, title, difficulty, ok, fetched_at in cur.fetchall():
+                    found[slug] = (problem_id, title, difficulty, bool(ok), float(fetched_at))
+        finally:
+            cur.close()
+    return found
+
+
+def put_cached_metadata_many(entries: list[tuple]) -> None:
+    """Upserts (slug, problem_id, title, difficulty, found, fetched_at) cache entries."""
+    if not entries:
+        return
+
+    if _is_postgres():
+        from psycopg2.extras import execute_values
+
+        # One row per slug, or ON CONFLICT would touch the same row twice.
+        rows = list({e[0]: e for e in entries}.values())
+        with connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO leetcode_metadata_cache (slug, problem_id, title, difficulty, found, fetched_at)
+                    VALUES %s
+                    ON CONFLICT (slug) DO UPDATE SET
+                        problem_id = EXCLUDED.problem_id, title = EXCLUDED.title,
+                        difficulty = EXCLUDED.difficulty,
+                        found = EXCLUDED.found, fetched_at = EXCLUDED.fetched_at
+                    """,
+                    rows,
+                )
+            conn.commit()
+        return
+
+    with connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO leetcode_metadata_cache (slug, problem_id, title, difficulty, found, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(slug) DO UPDATE SET
+                problem_id = excluded.problem_id, title = excluded.title,
+                difficulty = excluded.difficulty,
+                found = excluded.found, fetched_at = excluded.fetched_at
+            """,
+            [(slug, pid, title, difficulty, int(ok), ts) for slug, pid, title, difficulty, ok, ts in entries],
+        )
+        conn.commit()
+
+
+def get_catalog_entries(slugs: list[str]) -> dict[str, tuple]:
+    """Returns {slug: (frontend_id, title, difficulty)} for slugs in the local catalog."""
+    slugs = list(dict.fromkeys(s for s in slugs if s))
+    if not slugs:
+        return {}
+
+    found: dict[str, tuple] = {}
+    ph = "%s" if _is_postgres() else "?"
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            for marks, chunk in in_chunks(slugs, ph):
+                cur.execute(
+                    f"SELECT slug, frontend_id, title, difficulty FROM leetcode_catalog WHERE slug IN ({marks})",
+                    tuple(chunk),
+                )
+                for slug, frontend_id, title, difficulty in cur.fetchall():
+                    found[slug] = (frontend_id, title, difficulty)
+        finally:
+            cur.close()
+    return found
+
+
+def find_catalog_entry(*, frontend_id: int | None = None, title: str | None = None):
+    """Looks up one catalog row (slug, frontend_id, title, difficulty) by problem number or title.
+
+    Title matching ignores case. Returns None when nothing matches.
+    """
+    if frontend_id is None and not title:
+        return None
+
+    if _is_postgres():
+        if frontend_id is not None:
+            sql, params = "WHERE frontend_id = %s", (frontend_id,)
+        else:
+            sql, params = "WHERE LOWER(title) = LOWER(%s)", (title.strip(),)
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT slug, frontend_id, title, difficulty FROM leetcode_catalog {sql} LIMIT 1", params)
+                return cur.fetchone()
+
+    if frontend_id is not None:
+        sql, params = "WHERE frontend_id = ?", (frontend_id,)
+    else:
+        sql, params = "WHERE title = ? COLLATE NOCASE", (title.strip(),)
+    with connection() as conn:
+        return conn.execute(
+            f"SELECT slug, frontend_id, title, difficulty FROM leetcode_catalog {sql} LIMIT 1", params
+        ).fetchone()
+
+
+def count_catalog() -> int:
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT COUNT(*) FROM leetcode_catalog")
+            return int(cur.fetchone()[0])
+        finally:
+            cur.close()
+
+
+def merge_catalog(entries: list[tuple]) -> tuple[int, int]:
+    """Upserts (slug, frontend_id, title, difficulty) rows, touching only rows that changed.
+
+    A problem whose slug changed replaces its old row. Returns (inserted, updated).
+    """
+    # One row per slug and per problem number, last occurrence wins.
+    by_slug = {e[0]: e for e in entries if e[0]}
+    by_id: dict = {}
+    for e in by_slug.values():
+        by_id[e[1] if e[1] is not None else ("slug", e[0])] = e
+    rows = list(by_id.values())
+    if not rows:
+        return 0, 0
+
+    renamed = [(e[1], e[0]) for e in rows if e[1] is not None]
+
+    if _is_postgres():
+        from psycopg2.extras import execute_batch, execute_values
+
+        with connection() as conn:
+            with conn.cursor() as cur:
+                execute_batch(cur, "DELETE FROM leetcode_catalog WHERE frontend_id = %s AND slug <> %s", renamed)
+                returned = execute_values(
+                    cur,
+                    """
+                    INSERT INTO leetcode_catalog (slug, frontend_id, title, difficulty)
+                    VALUES %s
+                    ON CONFLICT (slug) DO UPDATE SET
+                        frontend_id = EXCLUDED.frontend_id, title = EXCLUDED.title,
+                        difficulty = EXCLUDED.difficulty
+                    WHERE (leetcode_catalog.frontend_id, leetcode_catalog.title, leetcode_catalog.difficulty)
+                        IS DISTINCT FROM (EXCLUDED.frontend_id, EXCLUDED.title, EXCLUDED.difficulty)
+                    RETURNING (xmax = 0)
+                    """,
+                    rows,
+                    page_size=1000,
+                    fetch=True,
+                )
+            conn.commit()
+        inserted = sum(1 for (is_insert,) in returned if is_insert)
+        return inserted, len(returned) - inserted
+
+    with connection() as conn:
+        conn.executemany("DELETE FROM leetcode_catalog WHERE frontend_id = ? AND slug <> ?", renamed)
+        before = {r[0] for r in conn.execute("SELECT slug FROM leetcode_catalog")}
+        changes_before = conn.total_changes
+        conn.executemany(
+            """
+            INSERT INTO leetcode_catalog (slug, frontend_id, title, difficulty)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(slug) DO UPDATE SET
+                frontend_id = excluded.frontend_id, title = excluded.title,
+                difficulty = excluded.difficulty
+            WHERE frontend_id IS NOT excluded.frontend_id
+                OR title IS NOT excluded.title
+                OR difficulty IS NOT excluded.difficulty
+            """,
+            rows,
+        )
+        changed = conn.total_changes - changes_before
+        conn.commit()
+    inserted = sum(1 for e in rows if e[0] not in before)
+    return inserted, changed - inserted
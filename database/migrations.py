@@ -0,0 +1,453 @@
+import sqlite3
+import threading
+
+from .config import get_database_url, get_db_path
+from .db import _is_postgres, connection
+
+# Arbitrary constant shared by every app process; serializes concurrent migrators on Postgres.
+_PG_ADVISORY_LOCK_KEY = 727_310_001
+
+
+def _sqlite_has_column(cur, table: str, column: str) -> bool:
+    rows = cur.execute(f"PRAGMA table_info({table});").fetchall()
+    return any(r[1] == column for r in rows)
+
+
+def _v1_questions_table(cur, postgres: bool) -> None:
+    # Also upgrades tables created before these columns existed.
+    if postgres:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS questions (
+                id SERIAL PRIMARY KEY,
+                text TEXT NOT NULL,
+                difficulty TEXT NOT NULL DEFAULT 'unknown'
+                ,created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                ,last_reviewed TIMESTAMPTZ
+                ,times_reviewed INTEGER NOT NULL DEFAULT 0
+                ,link TEXT
+                ,notes TEXT
+            )
+            """
+        )
+        cur.execute(
+            """
+            ALTER TABLE questions
+                ADD COLUMN IF NOT EXISTS difficulty TEXT NOT NULL DEFAULT 'unknown',
+                ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                ADD COLUMN IF NOT EXISTS link TEXT,
+                ADD COLUMN IF NOT EXISTS last_reviewed TIMESTAMPTZ,
+                ADD COLUMN IF NOT EXISTS times_reviewed INTEGER NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS notes TEXT
+            """
+        )
+        return
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            difficulty TEXT NOT NULL DEFAULT 'unknown'
+            ,created_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+            ,last_reviewed TEXT
+            ,times_reviewed INTEGER NOT NULL DEFAULT 0
+            ,link TEXT
+            ,notes TEXT
+        )
+        """
+    )
+    for column, ddl in [
+        ("difficulty", "difficulty TEXT NOT NULL DEFAULT 'unknown'"),
+        ("created_at", "created_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)"),
+        ("link", "link TEXT"),
+        ("last_reviewed", "last_reviewed TEXT"),
+        ("times_reviewed", "times_reviewed INTEGER NOT NULL DEFAULT 0"),
+        ("notes", "notes TEXT"),
+    ]:
+        if not _sqlite_has_column(cur, "questions", column):
+            cur.execute(f"ALTER TABLE questions ADD COLUMN {ddl}")
+
+
+def _v2_backfill_nulls(cur, postgres: bool) -> None:
+    if postgres:
+        cur.execute("UPDATE questions SET difficulty = 'unknown' WHERE difficulty IS NULL")
+    cur.execute("UPDATE questions SET times_reviewed = 0 WHERE times_reviewed IS NULL")
+
+
+def _v3_next_due_at(cur, postgres: bool) -> None:
+    # next_due_at = last_reviewed + 2**times_reviewed days, exponent capped so the
+    # date stays inside both backends' timestamp range. NULL means never reviewed.
+    if postgres:
+        cur.execute("ALTER TABLE questions ADD COLUMN IF NOT EXISTS next_due_at TIMESTAMPTZ")
+        cur.execute(
+            """
+            UPDATE questions
+            SET next_due_at = last_reviewed
+                + make_interval(days => 1 << LEAST(GREATEST(COALESCE(times_reviewed, 0), 0), 20))
+            WHERE last_reviewed IS NOT NULL
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_questions_next_due ON questions (next_due_at ASC NULLS FIRST, id)"
+        )
+        return
+
+    if not _sqlite_has_column(cur, "questions", "next_due_at"):
+        cur.execute("ALTER TABLE questions ADD COLUMN next_due_at TEXT")
+    cur.execute(
+        """
+        UPDATE questions
+        SET next_due_at = datetime(
+            last_reviewed,
+            '+' || (1 << MIN(MAX(COALESCE(times_reviewed, 0), 0), 20)) || ' days'
+        )
+        WHERE last_reviewed IS NOT NULL
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_next_due ON questions (next_due_at, id)")
+
+
+def _v4_created_at_index(cur, postgres: bool) -> None:
+    # Backs the library's ORDER BY created_at DESC, id DESC and its keyset cursor.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_created ON questions (created_at, id)")
+
+
+def _v5_difficulty_id_index(cur, postgres: bool) -> None:
+    # Lets random picks find MIN/MAX(id) and probe ids within one difficulty.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_difficulty_id ON questions (difficulty, id)")
+
+
+def _v6_leetcode_metadata_cache(cur, postgres: bool) -> None:
+    # found = false is a negative entry for a slug LeetCode doesn't know.
+    if postgres:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leetcode_metadata_cache (
+                slug TEXT PRIMARY KEY,
+                problem_id INTEGER,
+                title TEXT,
+                found BOOLEAN NOT NULL,
+                fetched_at DOUBLE PRECISION NOT NULL
+            )
+            """
+        )
+        return
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leetcode_metadata_cache (
+            slug TEXT PRIMARY KEY,
+            problem_id INTEGER,
+            title TEXT,
+            found INTEGER NOT NULL,
+            fetched_at REAL NOT NULL
+        )
+        """
+    )
+
+
+def _v7_leetcode_cache_difficulty(cur, postgres: bool) -> None:
+    if postgres:
+        cur.execute("ALTER TABLE leetcode_metadata_cache ADD COLUMN IF NOT EXISTS difficulty TEXT")
+    elif not _sqlite_has_column(cur, "leetcode_metadata_cache", "difficulty"):
+        cur.execute("ALTER TABLE leetcode_metadata_cache ADD COLUMN difficulty TEXT")
+
+
+def _v8_leetcode_catalog(cur, postgres: bool) -> None:
+    # Local copy of LeetCode's problem list, loaded from a JSON snapshot.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leetcode_catalog (
+            slug TEXT PRIMARY KEY,
+            frontend_id INTEGER,
+            title TEXT NOT NULL,
+            difficulty TEXT
+        )
+        """
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_leetcode_catalog_frontend_id ON leetcode_catalog (frontend_id)"
+    )
+    if postgres:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_leetcode_catalog_title ON leetcode_catalog (LOWER(title))")
+    else:
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_leetcode_catalog_title ON leetcode_catalog (title COLLATE NOCASE)"
+        )
+
+
+def _v9_updated_at_and_tombstones(cur, postgres: bool) -> None:
+    # Lets readers pull only what changed since their last sync; see list_questions_since().
+    if postgres:
+        cur.execute("ALTER TABLE questions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS questions_tombstones (
+                id INTEGER PRIMARY KEY,
+                deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+    else:
+        # SQLite can't ADD COLUMN with a non-constant default, so writers set it explicitly.
+        if not _sqlite_has_column(cur, "questions", "updated_at"):
+            cur.execute("ALTER TABLE questions ADD COLUMN updated_at TEXT")
+        cur.execute(
+            "UPDATE questions SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE updated_at IS NULL"
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS questions_tombstones (
+                id INTEGER PRIMARY KEY,
+                deleted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            )
+            """
+        )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_updated ON questions (updated_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_tombstones_deleted ON questions_tombstones (deleted_at)")
+
+
+def _v10_full_text_search(cur, postgres: bool) -> None:
+    # Indexes problem text (weighted higher) and notes for search_questions().
+    if postgres:
+        cur.execute(
+            """
+            ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', COALESCE(text, '')), 'A')
+                || setweight(to_tsvector('english', COALESCE(notes, '')), 'B')
+            ) STORED
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_search ON questions USING GIN (search_vector)")
+        return
+
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                text, notes, content='questions', content_rowid='id', tokenize='porter unicode61'
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5; search_questions() falls back to LIKE.
+        return
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+            INSERT INTO questions_fts(rowid, text, notes) VALUES (new.id, new.text, new.notes);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, text, notes) VALUES ('delete', old.id, old.text, old.notes);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF text, notes ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, text, notes) VALUES ('delete', old.id, old.text, old.notes);
+            INSERT INTO questions_fts(rowid, text, notes) VALUES (new.id, new.text, new.notes);
+        END
+        """
+    )
+    # Title matches count ten times as much as notes; ORDER BY rank then uses these weights.
+    cur.execute("INSERT INTO questions_fts(questions_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    cur.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+
+
+def _v11_filter_indexes(cur, postgres: bool) -> None:
+    # Back query_questions(): one difficulty in library order, review-age filters/sorts,
+    # and the never-reviewed questions of one difficulty (a partial index, so it stays small).
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_difficulty_created ON questions (difficulty, created_at, id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_questions_never_reviewed ON questions (difficulty, created_at, id) "
+        "WHERE last_reviewed IS NULL"
+    )
+    if postgres:
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_questions_last_reviewed ON questions (last_reviewed ASC NULLS FIRST, id)"
+        )
+    else:
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_last_reviewed ON questions (last_reviewed, id)")
+
+
+def _v12_review_events(cur, postgres: bool) -> None:
+    # Append-only review history; mark_reviewed() writes it and updates the counters from it.
+    # No foreign key: history outlives deleted questions.
+    if postgres:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS review_events (
+                id BIGSERIAL PRIMARY KEY,
+                question_id INTEGER NOT NULL,
+                reviewed_at TIMESTAMPTZ NOT NULL,
+                outcome TEXT
+            )
+            """
+        )
+    else:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS review_events (
+                id INTEGER PRIMARY KEY,
+                question_id INTEGER NOT NULL,
+                reviewed_at TEXT NOT NULL,
+                outcome TEXT
+            )
+            """
+        )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_review_events_question ON review_events (question_id, reviewed_at)"
+    )
+
+
+def _v13_change_ids(cur, postgres: bool) -> None:
+    # Commit-ordered change markers for list_questions_since(). updated_at is stamped when a
+    # statement runs, not when it commits, so a long transaction could land behind a cursor.
+    if postgres:
+        # The writing transaction's id; readers resume from their snapshot's oldest running one.
+        for table in ("questions", "questions_tombstones"):
+            cur.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS change_id xid8 NOT NULL DEFAULT pg_current_xact_id()"
+            )
+    else:
+        # SQLite has one writer at a time, so a counter bumped inside each write transaction
+        # numbers changes in commit order.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS questions_change_clock (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                change_id INTEGER NOT NULL
+            )
+            """
+        )
+        cur.execute("INSERT OR IGNORE INTO questions_change_clock(id, change_id) VALUES (1, 0)")
+        for table in ("questions", "questions_tombstones"):
+            if not _sqlite_has_column(cur, table, "change_id"):
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN change_id INTEGER NOT NULL DEFAULT 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_change ON questions (change_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_tombstones_change ON questions_tombstones (change_id)")
+    # Only the delta sync read these.
+    cur.execute("DROP INDEX IF EXISTS idx_questions_updated")
+    cur.execute("DROP INDEX IF EXISTS idx_questions_tombstones_deleted")
+
+
+# Append-only. Never edit or renumber a step that has shipped; add a new one instead.
+MIGRATIONS = [
+    (1, "questions table and columns", _v1_questions_table),
+    (2, "backfill NULL difficulty / times_reviewed", _v2_backfill_nulls),
+    (3, "next_due_at column and index", _v3_next_due_at),
+    (4, "created_at index for library paging", _v4_created_at_index),
+    (5, "(difficulty, id) index for random picks", _v5_difficulty_id_index),
+    (6, "LeetCode metadata cache table", _v6_leetcode_metadata_cache),
+    (7, "difficulty in LeetCode metadata cache", _v7_leetcode_cache_difficulty),
+    (8, "LeetCode problem catalog", _v8_leetcode_catalog),
+    (9, "updated_at column and delete tombstones", _v9_updated_at_and_tombstones),
+    (10, "full-text search index", _v10_full_text_search),
+    (11, "library filter indexes", _v11_filter_indexes),
+    (12, "review event log", _v12_review_events),
+    (13, "commit-ordered change ids for delta sync", _v13_change_ids),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+_migrated_targets: set[str] = set()
+_migrate_lock = threading.Lock()
+
+
+def _target() -> str:
+    return get_database_url() or f"sqlite:{get_db_path()}"
+
+
+def _apply_postgres(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+            if cur.fetchone()[0] >= LATEST_VERSION:
+                conn.rollback()
+                return
+
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_PG_ADVISORY_LOCK_KEY,))
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+        # Re-read under the lock: another process may have just migrated.
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = cur.fetchone()[0]
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(cur, True)
+            cur.execute(
+                "INSERT INTO schema_version(version, description) VALUES (%s, %s)",
+                (version, description),
+            )
+    conn.commit()
+
+
+def _apply_sqlite(conn) -> None:
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+        )
+        """
+    )
+    if cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0] >= LATEST_VERSION:
+        return
+
+    # Take the write lock before re-reading so two processes can't both migrate.
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        current = cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(cur, False)
+            cur.execute(
+                "INSERT INTO schema_version(version, description) VALUES (?, ?)",
+                (version, description),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def migrate() -> None:
+    """Brings the schema up to LATEST_VERSION.
+
+    The database is consulted once per process and target; later calls return
+    immediately, so this is safe to call at the top of every page.
+    """
+    target = _target()
+    if target in _migrated_targets:
+        return
+
+    with _migrate_lock:
+        if target in _migrated_targets:
+            return
+        with connection() as conn:
+            if _is_postgres():
+                _apply_postgres(conn)
+            else:
+                _apply_sqlite(conn)
+        _migrated_targets.add(target)
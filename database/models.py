@@ -0,0 +1,107 @@
+import functools
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value) -> datetime | None:
+    """Returns a UTC-aware datetime for a stored timestamp, or None if missing or unparseable.
+
+    psycopg2 already hands back datetimes; SQLite stores text such as
+    CURRENT_TIMESTAMP's "YYYY-MM-DD HH:MM:SS" (UTC) or whatever ISO string an
+    edit saved. Naive values are taken as UTC, like pd.to_datetime(utc=True).
+    """
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+# Drivers build a new str per row; share one object per known difficulty instead.
+_DIFFICULTIES = {d: d for d in ("easy", "medium", "hard", "unknown")}
+
+
+class Question:
+    """One questions row, with timestamps parsed once when it is loaded.
+
+    Uses __slots__ so the thousands of rows held by the read model stay small.
+    """
+
+    __slots__ = ("id", "text", "difficulty", "created_at", "link", "last_reviewed", "times_reviewed", "notes")
+
+    def __init__(
+        self,
+        id: int,
+        text: str,
+        difficulty: str,
+        created_at: datetime | None,
+        link: str | None,
+        last_reviewed: datetime | None,
+        times_reviewed: int,
+        notes: str | None,
+    ):
+        self.id = id
+        self.text = text
+        self.difficulty = difficulty
+        self.created_at = created_at
+        self.link = link
+        self.last_reviewed = last_reviewed
+        self.times_reviewed = times_reviewed
+        self.notes = notes
+
+    @classmethod
+    def from_row(cls, row) -> "Question":
+        """Builds a Question from a row in list_questions() column order."""
+        qid, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes = row
+        return cls(
+            int(qid),
+            text,
+            _DIFFICULTIES.get(difficulty, difficulty),
+            parse_timestamp(created_at),
+            link,
+            parse_timestamp(last_reviewed),
+            int(times_reviewed or 0),
+            notes,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Question):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Question(id={self.id!r}, text={self.text!r}, difficulty={self.difficulty!r})"
+
+
+def sqlite_question_factory(cursor, row) -> Question:
+    """sqlite3 row_factory that returns Question objects."""
+    return Question.from_row(row)
+
+
+class _QuestionRowsMixin:
+    """psycopg2 cursor mixin whose fetch methods return Question objects."""
+
+    def fetchone(self):
+        row = super().fetchone()
+        return None if row is None else Question.from_row(row)
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        return [Question.from_row(row) for row in rows]
+
+    def fetchall(self):
+        return [Question.from_row(row) for row in super().fetchall()]
+
+
+@functools.cache
+def postgres_question_cursor(base=None):
+    """Returns a cursor class combining the Question mixin with `base` (the connection's cursor_factory)."""
+    if base is None:
+        import psycopg2.extensions
+
+        base = psycopg2.extensions.cursor
+    return type(f"Question{base.__name__}", (_QuestionRowsMixin, base), {})
@@ -1,28 +1,110 @@
+import functools
+import logging
+import random
+import re
 import sqlite3
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
 
-from .config import get_database_url
-from .db import connect
+import pandas as pd
+
+from .config import (
+    get_database_url,
+    get_review_batch_size,
+    get_review_durability,
+    get_review_flush_interval_ms,
+    get_review_max_pending,
+    get_sync_interval,
+)
+from .db import connection, in_chunks
+from .models import Question, parse_timestamp, postgres_question_cursor, sqlite_question_factory
+from .read_model import get_read_model
+from .review_log import ReviewEvent, ReviewWriter
+from scheduling.queue import get_review_queue
+from scheduling.sampler import get_due_sampler
+
+logger = logging.getLogger(__name__)
 
 ALLOWED_DIFFICULTIES = {"easy", "medium", "hard", "unknown"}
 
+# last_reviewed + 2**times_reviewed days; the exponent cap keeps dates in range.
+_NEXT_DUE_AT_POSTGRES = (
+    "last_reviewed + make_interval(days => 1 << LEAST(GREATEST(COALESCE(times_reviewed, 0), 0), 20))"
+)
+_NEXT_DUE_AT_SQLITE = (
+    "datetime(last_reviewed, '+' || (1 << MIN(MAX(COALESCE(times_reviewed, 0), 0), 20)) || ' days')"
+)
+
+# Write timestamp for updated_at / deleted_at. SQLite keeps milliseconds so deltas order correctly.
+_NOW_SQLITE = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# change_id stamp for list_questions_since(); every write to questions or
+# questions_tombstones sets it. Postgres uses the writing transaction's id. SQLite
+# reads a counter that _bump_change_clock() advances at the start of the write.
+_CHANGE_ID_POSTGRES = "pg_current_xact_id()"
+_CHANGE_ID_SQLITE = "(SELECT change_id FROM questions_change_clock)"
+
 def _is_postgres() -> bool:
     return bool(get_database_url())
 
-def add_question(
+def _bump_change_clock(conn) -> None:
+    """Starts a SQLite write: takes the write lock and a change_id no committed change has."""
+    conn.execute("UPDATE questions_change_clock SET change_id = change_id + 1")
+
+def _question_cursor(conn):
+    """A cursor on `conn` whose fetches return Question objects."""
+    if _is_postgres():
+        return conn.cursor(cursor_factory=postgres_question_cursor(conn.cursor_factory))
+    cur = conn.cursor()
+    cur.row_factory = sqlite_question_factory
+    return cur
+
+
+def _db_timestamp(value):
+    """A datetime as the database compares it: SQLite stores CURRENT_TIMESTAMP text in UTC."""
+    if isinstance(value, datetime) and not _is_postgres():
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def _keyset_params(after: tuple) -> tuple:
+    """(created_at, id) of a keyset cursor, with created_at as the database stores it."""
+    created_at, question_id = after
+    return _db_timestamp(created_at), question_id
+
+
+def _questions_changed(question_ids=None) -> None:
+    """Tells in-process caches a write landed; `question_ids` None means any row may have changed."""
+    get_read_model().invalidate(question_ids)
+    get_review_queue().mark_stale(question_ids)
+    get_due_sampler().mark_stale(question_ids)
+
+def _review_state_changed(question_id: int, review_state) -> None:
+    """Updates the review queue and sampler from the (last_reviewed, times_reviewed) a write returned."""
+    if review_state is not None:
+        last_reviewed, times_reviewed = parse_timestamp(review_state[0]), int(review_state[1] or 0)
+        get_review_queue().upsert(question_id, last_reviewed, times_reviewed)
+        get_due_sampler().upsert(question_id, last_reviewed, times_reviewed)
+
+
+def _normalize_new_question(
     text: str,
     difficulty: str = "unknown",
     *,
     question_id: int | None = None,
     link: str | None = None,
     notes: str | None = None,
-) -> bool:
+) -> tuple | None:
+    """Cleans add_question() input; returns (question_id, text, difficulty, link, notes) or None."""
     text = (text or "").strip()
     difficulty = (difficulty or "unknown").strip().lower()
     link = (link or "").strip() or None
     if notes is not None:
         notes = (notes or "").strip()
     if not text:
-        return False
+        return None
 
     if difficulty not in ALLOWED_DIFFICULTIES:
         difficulty = "unknown"
@@ -36,21 +118,39 @@ def add_question(
     if question_id is not None and question_id <= 0:
         question_id = None
 
+    return question_id, text, difficulty, link, notes
+
+
+def add_question(
+    text: str,
+    difficulty: str = "unknown",
+    *,
+    question_id: int | None = None,
+    link: str | None = None,
+    notes: str | None = None,
+) -> bool:
+    cleaned = _normalize_new_question(text, difficulty, question_id=question_id, link=link, notes=notes)
+    if cleaned is None:
+        return False
+    question_id, text, difficulty, link, notes = cleaned
+
     if _is_postgres():
-        with connect() as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 if question_id is None:
                     cur.execute(
-                        "INSERT INTO questions(text, difficulty, link, notes) VALUES (%s, %s, %s, %s)",
+                        "INSERT INTO questions(text, difficulty, link, notes) VALUES (%s, %s, %s, %s) RETURNING id",
                         (text, difficulty, link, notes),
                     )
+                    question_id = cur.fetchone()[0]
                 else:
                     cur.execute(
                         """
                         INSERT INTO questions(id, text, difficulty, link, notes)
                         VALUES (%s, %s, %s, %s, %s)
                         ON CONFLICT (id)
-                        DO UPDATE SET text = EXCLUDED.text, difficulty = EXCLUDED.difficulty, link = EXCLUDED.link, notes = EXCLUDED.notes
+                        DO UPDATE SET text = EXCLUDED.text, difficulty = EXCLUDED.difficulty, link = EXCLUDED.link, notes = EXCLUDED.notes,
+                            updated_at = NOW(), change_id = EXCLUDED.change_id
                         """,
                         (question_id, text, difficulty, link, notes),
                     )
@@ -64,26 +164,32 @@ def add_question(
                         """
                     )
             conn.commit()
+        _questions_changed([question_id])
         return True
 
-    with connect() as conn:
+    with connection() as conn:
+        _bump_change_clock(conn)
         if question_id is None:
-            conn.execute(
-                "INSERT INTO questions(text, difficulty, link, notes) VALUES (?, ?, ?, ?)",
+            question_id = conn.execute(
+                "INSERT INTO questions(text, difficulty, link, notes, updated_at, change_id) "
+                f"VALUES (?, ?, ?, ?, {_NOW_SQLITE}, {_CHANGE_ID_SQLITE})",
                 (text, difficulty, link, notes),
-            )
+            ).lastrowid
         else:
             try:
                 conn.execute(
-                    "INSERT INTO questions(id, text, difficulty, link, notes) VALUES (?, ?, ?, ?, ?)",
+                    "INSERT INTO questions(id, text, difficulty, link, notes, updated_at, change_id) "
+                    f"VALUES (?, ?, ?, ?, ?, {_NOW_SQLITE}, {_CHANGE_ID_SQLITE})",
                     (question_id, text, difficulty, link, notes),
                 )
             except sqlite3.IntegrityError:
                 conn.execute(
-                    "UPDATE questions SET text = ?, difficulty = ?, link = ?, notes = ? WHERE id = ?",
+                    "UPDATE questions SET text = ?, difficulty = ?, link = ?, notes = ?, "
+                    f"updated_at = {_NOW_SQLITE}, change_id = {_CHANGE_ID_SQLITE} WHERE id = ?",
                     (text, difficulty, link, notes, question_id),
                 )
         conn.commit()
+    _questions_changed([question_id])
     return True
 
 def list_questions(limit: int | None = None):
@@ -94,44 +200,317 @@ def list_questions(limit: int | None = None):
     )
 
     if _is_postgres():
-        with connect() as conn:
-            with conn.cursor() as cur:
+        with connection() as conn:
+            with _question_cursor(conn) as cur:
                 if limit is None:
                     cur.execute(base_sql)
                 else:
                     cur.execute(f"{base_sql} LIMIT %s", (limit,))
                 return cur.fetchall()
 
-    with connect() as conn:
+    with connection() as conn:
         if limit is None:
-            return conn.execute(base_sql).fetchall()
-        return conn.execute(f"{base_sql} LIMIT ?", (limit,)).fetchall()
+            return _question_cursor(conn).execute(base_sql).fetchall()
+        return _question_cursor(conn).execute(f"{base_sql} LIMIT ?", (limit,)).fetchall()
+
+
+def list_questions_page(after: tuple | None = None, page_size: int = 50):
+    """Returns one page of the library in list_questions() order.
 
+    `after` is (q.created_at, q.id) of the previous page's last Question; None
+    starts from the newest question. Each page is an index range scan, so its
+    cost does not depend on how deep into the library it is.
+    """
+    page_size = max(1, int(page_size))
+    if after is not None:
+        after = _keyset_params(after)
+    columns = "SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes FROM questions"
 
-def get_random_question():
-    """Returns one random question row or None if table is empty."""
     if _is_postgres():
-        with connect() as conn:
+        with connection() as conn:
+            with _question_cursor(conn) as cur:
+                if after is None:
+                    cur.execute(f"{columns} ORDER BY created_at DESC, id DESC LIMIT %s", (page_size,))
+                else:
+                    cur.execute(
+                        f"{columns} WHERE (created_at, id) < (%s, %s) ORDER BY created_at DESC, id DESC LIMIT %s",
+                        (after[0], after[1], page_size),
+                    )
+                return cur.fetchall()
+
+    with connection() as conn:
+        if after is None:
+            return _question_cursor(conn).execute(
+                f"{columns} ORDER BY created_at DESC, id DESC LIMIT ?", (page_size,)
+            ).fetchall()
+        return _question_cursor(conn).execute(
+            f"{columns} WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+            (after[0], after[1], page_size),
+        ).fetchall()
+
+
+# list_questions() columns, in order; list_questions_frame() returns them with these dtypes.
+QUESTION_FRAME_COLUMNS = ("id", "text", "difficulty", "created_at", "link", "last_reviewed", "times_reviewed", "notes")
+_FRAME_BATCH_SIZE = 5000
+
+
+def list_questions_frame(
+    limit: int | None = None, after: tuple | None = None, *, batch_size: int = _FRAME_BATCH_SIZE
+) -> pd.DataFrame:
+    """list_questions() / list_questions_page() as a DataFrame, built column by column.
+
+    Rows are fetched `batch_size` at a time and transposed straight into
+    per-column lists, so no per-row dicts or intermediate frames are built.
+    Timestamps are parsed once per column into UTC datetimes. `after` is a
+    keyset cursor as for list_questions_page(); the cursor for the next page is
+    in `frame.attrs["cursor"]` (None when the result is empty).
+    """
+    ph = "%s" if _is_postgres() else "?"
+    sql = "SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes FROM questions"
+    params: tuple = ()
+    if after is not None:
+        sql += f" WHERE (created_at, id) < ({ph}, {ph})"
+        params += _keyset_params(after)
+    sql += " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += f" LIMIT {ph}"
+        params += (max(0, int(limit)),)
+    return _fetch_question_frame(sql, params, batch_size)
+
+
+def _fetch_question_frame(sql: str, params: tuple, batch_size: int = _FRAME_BATCH_SIZE) -> pd.DataFrame:
+    """Runs a SELECT of the list_questions() columns and builds the typed frame column by column."""
+    columns: list[list] = [[] for _ in QUESTION_FRAME_COLUMNS]
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                for column, values in zip(columns, zip(*batch)):
+                    column.extend(values)
+        finally:
+            cur.close()
+
+    ids, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes = columns
+    cursor = (created_at[-1], ids[-1]) if ids else None
+    # Object Series keep pandas from re-inferring string columns, and parse timestamps faster.
+    frame = pd.DataFrame(
+        {
+            "id": pd.Series(ids, dtype="int64"),
+            "text": pd.Series(text, dtype=object),
+            "difficulty": pd.Categorical(difficulty, categories=sorted(ALLOWED_DIFFICULTIES)),
+            "created_at": pd.to_datetime(pd.Series(created_at, dtype=object), utc=True, errors="coerce", format="ISO8601"),
+            "link": pd.Series(link, dtype=object),
+            "last_reviewed": pd.to_datetime(
+                pd.Series(last_reviewed, dtype=object), utc=True, errors="coerce", format="ISO8601"
+            ),
+            "times_reviewed": pd.Series([t or 0 for t in times_reviewed], dtype="int64"),
+            "notes": pd.Series(notes, dtype=object),
+        },
+        columns=list(QUESTION_FRAME_COLUMNS),
+    )
+    frame.attrs["cursor"] = cursor
+    return frame
+
+
+# query_questions() sort keys -> (Postgres, SQLite) ORDER BY. Only these reach the SQL.
+QUERY_ORDERS = {
+    "newest": ("created_at DESC, id DESC", "created_at DESC, id DESC"),
+    "oldest": ("created_at, id", "created_at, id"),
+    "most_due": ("next_due_at ASC NULLS FIRST, id", "next_due_at, id"),
+    "least_recently_reviewed": ("last_reviewed ASC NULLS FIRST, id", "last_reviewed, id"),
+    "most_reviewed": ("times_reviewed DESC, id DESC", "times_reviewed DESC, id DESC"),
+}
+_QUERY_DEFAULT_LIMIT = 500
+
+
+def query_questions(
+    *,
+    difficulty: str | None = None,
+    reviewed_before: datetime | None = None,
+    never_reviewed: bool | None = None,
+    min_times_reviewed: int | None = None,
+    order_by: str = "newest",
+    limit: int | None = _QUERY_DEFAULT_LIMIT,
+) -> pd.DataFrame:
+    """Filters and sorts the library in the database; returns a list_questions_frame()-style frame.
+
+    `never_reviewed` True keeps only unreviewed questions, False only reviewed
+    ones, None either. `reviewed_before` keeps questions last reviewed before
+    that time. `order_by` must be a key of QUERY_ORDERS. Every filter is a bound
+    parameter, and the filter indexes from migration 11 serve the common
+    combinations without reading the whole table.
+    """
+    if order_by not in QUERY_ORDERS:
+        raise ValueError(f"order_by must be one of {sorted(QUERY_ORDERS)}, got {order_by!r}")
+    postgres = _is_postgres()
+    ph = "%s" if postgres else "?"
+
+    clauses: list[str] = []
+    params: tuple = ()
+    if difficulty is not None:
+        clauses.append(f"difficulty = {ph}")
+        params += ((difficulty or "").strip().lower(),)
+    if never_reviewed is True:
+        # SQLite's stats can't see that NULLs share one last_reviewed value, so it would
+        # take the last_reviewed index and sort; the hint keeps idx_questions_never_reviewed.
+        clauses.append("last_reviewed IS NULL" if postgres else "likelihood(last_reviewed IS NULL, 0.5)")
+    elif never_reviewed is False:
+        clauses.append("last_reviewed IS NOT NULL")
+    if reviewed_before is not None:
+        clauses.append(f"last_reviewed < {ph}")
+        params += (_db_timestamp(reviewed_before),)
+    if min_times_reviewed is not None and int(min_times_reviewed) > 0:
+        clauses.append(f"times_reviewed >= {ph}")
+        params += (int(min_times_reviewed),)
+
+    sql = "SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes FROM questions"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY " + QUERY_ORDERS[order_by][0 if postgres else 1]
+    if limit is not None:
+        sql += f" LIMIT {ph}"
+        params += (max(0, int(limit)),)
+    return _fetch_question_frame(sql, params)
+
+
+def count_questions() -> int:
+    if _is_postgres():
+        with connection() as conn:
             with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM questions")
+                return int(cur.fetchone()[0])
+
+    with connection() as conn:
+        return int(conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0])
+
+
+def list_review_state(question_ids=None):
+    """Returns (id, last_reviewed, times_reviewed) for every question, or just `question_ids`.
+
+    last_reviewed is a UTC datetime (None if never reviewed). This is the
+    loader for the review queue and due sampler in scheduling.
+    """
+    sql = "SELECT id, last_reviewed, times_reviewed FROM questions"
+    if question_ids is not None:
+        question_ids = list(dict.fromkeys(int(question_id) for question_id in question_ids))
+        if not question_ids:
+            return []
+    ph = "%s" if _is_postgres() else "?"
+
+    rows = []
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            if question_ids is None:
+                cur.execute(sql)
+                rows = cur.fetchall()
+            else:
+                for marks, chunk in in_chunks(question_ids, ph):
+                    cur.execute(f"{sql} WHERE id IN ({marks})", tuple(chunk))
+                    rows.extend(cur.fetchall())
+        finally:
+            cur.close()
+    states = [(qid, parse_timestamp(last_reviewed), int(times or 0)) for qid, last_reviewed, times in rows]
+    pending = _pending_reviews()
+    if not pending:
+        return states
+    # Include reviews still waiting in the write-behind queue.
+    for i, (qid, last_reviewed, times) in enumerate(states):
+        if qid in pending:
+            count, latest = pending[qid]
+            states[i] = (qid, latest if last_reviewed is None else max(last_reviewed, latest), times + count)
+    return states
+
+
+def get_most_due(k: int = 1):
+    """Returns the k most due questions, soonest next_due_at first (never reviewed first).
+
+    Served by the next_due_at index, so the cost does not grow with the bank.
+    """
+    k = max(0, int(k))
+    if _is_postgres():
+        with connection() as conn:
+            with _question_cursor(conn) as cur:
                 cur.execute(
                     """
                     SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes
                     FROM questions
-                    ORDER BY RANDOM()
-                    LIMIT 1
-                    """
+                    ORDER BY next_due_at ASC NULLS FIRST, id
+                    LIMIT %s
+                    """,
+                    (k,),
                 )
-                return cur.fetchone()
+                return cur.fetchall()
 
-    with connect() as conn:
-        return conn.execute(
+    with connection() as conn:
+        return _question_cursor(conn).execute(
             """
             SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes
             FROM questions
-            ORDER BY RANDOM()
-            LIMIT 1
-            """
-        ).fetchone()
+            ORDER BY next_due_at, id
+            LIMIT ?
+            """,
+            (k,),
+        ).fetchall()
+
+
+# Random ids drawn per lookup; all are probed in one IN (...) query.
+_RANDOM_PROBES = 32
+
+
+def get_random_question(difficulty: str | None = None):
+    """Returns one random question row (optionally of one difficulty), or None if there is none.
+
+    Draws ids uniformly from [MIN(id), MAX(id)] and keeps the first draw that hits
+    a row, which is uniform over existing rows. Bounds and probes are index
+    lookups. If every draw lands in a gap, falls back to the first row at or
+    after one draw: still O(log n), but it slightly favours rows that follow gaps.
+    """
+    if difficulty is not None:
+        difficulty = (difficulty or "").strip().lower()
+        if difficulty not in ALLOWED_DIFFICULTIES:
+            return None
+
+    columns = "SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes FROM questions"
+    ph = "%s" if _is_postgres() else "?"
+    where = f"WHERE difficulty = {ph}" if difficulty is not None else "WHERE 1 = 1"
+    filter_params: tuple = (difficulty,) if difficulty is not None else ()
+
+    with connection() as conn:
+        cur = conn.cursor()
+        rows_cur = _question_cursor(conn)
+        try:
+            # Separate subqueries: SQLite only turns a lone MIN/MAX into an index seek.
+            cur.execute(
+                f"SELECT (SELECT MIN(id) FROM questions {where}), (SELECT MAX(id) FROM questions {where})",
+                filter_params * 2,
+            )
+            lo, hi = cur.fetchone()
+            if lo is None:
+                return None
+
+            draws = [random.randint(lo, hi) for _ in range(_RANDOM_PROBES)]
+            rows_cur.execute(
+                f"{columns} {where} AND id IN ({', '.join([ph] * len(draws))})",
+                filter_params + tuple(draws),
+            )
+            hits = {q.id: q for q in rows_cur.fetchall()}
+            for qid in draws:
+                if qid in hits:
+                    return hits[qid]
+
+            rows_cur.execute(
+                f"{columns} {where} AND id >= {ph} ORDER BY id LIMIT 1",
+                filter_params + (draws[0],),
+            )
+            return rows_cur.fetchone()
+        finally:
+            rows_cur.close()
+            cur.close()
 
 
 def get_question_by_id(question_id: int):
@@ -139,8 +518,8 @@ def get_question_by_id(question_id: int):
         return None
 
     if _is_postgres():
-        with connect() as conn:
-            with conn.cursor() as cur:
+        with connection() as conn:
+            with _question_cursor(conn) as cur:
                 cur.execute(
                     """
                     SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes
@@ -149,10 +528,10 @@ def get_question_by_id(question_id: int):
                     """,
                     (question_id,),
                 )
-                return cur.fetchone()
+                return _with_pending_reviews(cur.fetchone(), _pending_reviews())
 
-    with connect() as conn:
-        return conn.execute(
+    with connection() as conn:
+        question = _question_cursor(conn).execute(
             """
             SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes
             FROM questions
@@ -160,6 +539,310 @@ def get_question_by_id(question_id: int):
             """,
             (question_id,),
         ).fetchone()
+    return _with_pending_reviews(question, _pending_reviews())
+
+
+@dataclass(frozen=True)
+class ReviewContext:
+    question: Question | None  # None only when no question matches at all
+    fallback: bool  # True when `question` is a random pick rather than the candidate
+    missing_id: int | None  # the candidate id that no longer exists, if that caused the fallback
+
+
+def _query_review_context(candidate_id: int | None, difficulty: str | None) -> tuple[Question | None, bool]:
+    """(row, is_fallback): the candidate by id, else a random question, in one statement.
+
+    The random branch is get_random_question() in SQL: _RANDOM_PROBES ids drawn
+    between MIN(id) and MAX(id), the first that exists wins, and only if all
+    miss does it take the first id after a draw. Every part is an index seek.
+    Draws of the wrong difficulty sort last instead of being filtered out: a
+    WHERE on that join makes SQLite build a Bloom filter over the whole table.
+    """
+    postgres = _is_postgres()
+    ph = "%s" if postgres else "?"
+    where = f"difficulty = {ph}" if difficulty is not None else "1 = 1"
+    q_where = f"q.difficulty = {ph}" if difficulty is not None else "1 = 1"
+    filter_params: tuple = (difficulty,) if difficulty is not None else ()
+    draw = "b.lo + floor(random() * (b.hi - b.lo + 1))::bigint" if postgres else "b.lo + abs(random()) % (b.hi - b.lo + 1)"
+    columns = "q.id, q.text, q.difficulty, q.created_at, q.link, q.last_reviewed, q.times_reviewed, q.notes"
+    sql = f"""
+        WITH RECURSIVE bounds AS (
+            SELECT (SELECT MIN(id) FROM questions WHERE {where}) AS lo,
+                   (SELECT MAX(id) FROM questions WHERE {where}) AS hi
+        ),
+        draws(n, pivot) AS (
+            SELECT 1, {draw} FROM bounds b WHERE b.lo IS NOT NULL
+            UNION ALL
+            SELECT d.n + 1, {draw} FROM draws d, bounds b WHERE d.n < {_RANDOM_PROBES}
+        )
+        SELECT 0 AS pick_order, {columns} FROM questions q WHERE q.id = {ph}
+        UNION ALL
+        SELECT CASE WHEN {q_where} THEN d.n ELSE {_RANDOM_PROBES + 2} END AS pick_order, {columns}
+        FROM draws d JOIN questions q ON q.id = d.pivot
+        UNION ALL
+        SELECT * FROM (
+            SELECT {_RANDOM_PROBES + 1} AS pick_order, {columns} FROM questions q
+            WHERE {q_where} AND q.id >= (SELECT pivot FROM draws WHERE n = 1)
+            ORDER BY q.id
+            LIMIT 1
+        ) AS after_gap
+        ORDER BY pick_order
+        LIMIT 1
+    """
+    params = filter_params * 2 + (candidate_id,) + filter_params * 2
+
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            row = cur.fetchone()
+        finally:
+            cur.close()
+    if row is None:
+        return None, True
+    return _with_pending_reviews(Question.from_row(row[1:]), _pending_reviews()), row[0] > 0
+
+
+def get_review_context(candidate_id: int | None, difficulty: str | None = None) -> ReviewContext:
+    """What the Review page shows: the candidate question, or a random one if it's gone.
+
+    A candidate already in the read model costs no query; otherwise the
+    candidate lookup and the random fallback (optionally of one difficulty)
+    share one statement on one pooled connection.
+    """
+    if difficulty is not None:
+        difficulty = (difficulty or "").strip().lower()
+        if difficulty not in ALLOWED_DIFFICULTIES:
+            difficulty = None
+    candidate_id = int(candidate_id) if candidate_id else None
+
+    fetched: list[tuple[Question | None, bool]] = []
+
+    def load(question_id: int):
+        fetched.append(_query_review_context(question_id, difficulty))
+        question, fallback = fetched[0]
+        return None if fallback else question
+
+    if candidate_id is not None:
+        question = get_read_model().get(candidate_id, load)
+        if question is not None:
+            return ReviewContext(question, fallback=False, missing_id=None)
+
+    question, _fallback = fetched[0] if fetched else _query_review_context(None, difficulty)
+    return ReviewContext(question, fallback=True, missing_id=candidate_id)
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    question: Question
+    rank: float  # higher is better; only comparable within one result list
+    snippet: str  # excerpt around a match, matched terms wrapped in ** (markdown bold)
+
+
+_SEARCH_TERM = re.compile(r"\w+")
+_SEARCH_MAX_TERMS = 16
+
+
+def _snippet(text: str, notes: str | None, terms: list[str], *, before: int = 60, after: int = 120) -> str:
+    """Excerpt around the first term hit in text, then notes, with hits in **bold**.
+
+    Built in Python because FTS5's snippet() runs for every match before ORDER BY
+    rank ... LIMIT, which costs more than the ranking itself on common words.
+    Terms match as prefixes, with a plural s dropped to roughly follow stemming.
+    """
+    stems = [t[:-1] if len(t) > 3 and t.endswith("s") else t for t in terms]
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, stems)) + r")\w*", re.IGNORECASE)
+    for source in (text, notes):
+        hit = pattern.search(source or "")
+        if hit is None:
+            continue
+        start = max(0, hit.start() - before)
+        end = min(len(source), hit.end() + after)
+        if start > 0:
+            start = source.find(" ", start, hit.start()) + 1 or start
+        if end < len(source):
+            cut = source.rfind(" ", hit.end(), end)
+            end = cut if cut > 0 else end
+        excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", source[start:end].strip())
+        return ("…" if start > 0 else "") + excerpt + ("…" if end < len(source) else "")
+    return text
+
+
+def _sqlite_has_fts(conn) -> bool:
+    # Missing when the SQLite build that ran the migration had no FTS5.
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'").fetchone() is not None
+
+
+def search_questions(query: str, limit: int = 20) -> list[SearchResult]:
+    """Full-text search over problem text and notes, best match first.
+
+    Every word must match (title hits rank above notes hits) and the last
+    word also matches as a prefix, so results show up while typing.
+    Postgres uses the search_vector GIN index, SQLite the questions_fts FTS5
+    table; SQLite builds without FTS5 fall back to an unranked LIKE scan.
+    """
+    terms = _SEARCH_TERM.findall((query or "").lower())[:_SEARCH_MAX_TERMS]
+    limit = max(1, int(limit))
+    if not terms:
+        return []
+    columns = "q.id, q.text, q.difficulty, q.created_at, q.link, q.last_reviewed, q.times_reviewed, q.notes"
+
+    if _is_postgres():
+        tsquery = " & ".join([*terms[:-1], f"{terms[-1]}:*"])
+        with connection() as conn:
+            with conn.cursor() as cur:
+                # Headlines are costly, so build them only for the rows that made the cut.
+                cur.execute(
+                    f"""
+                    SELECT {columns}, hits.rank,
+                        ts_headline(
+                            'english', q.text || ' · ' || COALESCE(q.notes, ''), hits.query,
+                            'StartSel=**, StopSel=**, MaxWords=24, MinWords=8, MaxFragments=1'
+                        )
+                    FROM (
+                        SELECT id, ts_rank_cd(search_vector, query) AS rank, query
+                        FROM questions, to_tsquery('english', %s) AS query
+                        WHERE search_vector @@ query
+                        ORDER BY rank DESC, id
+                        LIMIT %s
+                    ) AS hits
+                    JOIN questions q ON q.id = hits.id
+                    ORDER BY hits.rank DESC, hits.id
+                    """,
+                    (tsquery, limit),
+                )
+                rows = cur.fetchall()
+        return [SearchResult(Question.from_row(r[:8]), float(r[8]), r[9]) for r in rows]
+
+    with connection() as conn:
+        if _sqlite_has_fts(conn):
+            # Quoted terms can't be read as FTS5 operators; the porter stemmer doesn't apply
+            # to prefix terms, so the last word is matched both whole and as a prefix.
+            match = " AND ".join([*(f'"{t}"' for t in terms[:-1]), f'("{terms[-1]}" OR "{terms[-1]}"*)'])
+            ranked = conn.execute(
+                "SELECT rowid, -rank FROM questions_fts WHERE questions_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+            if not ranked:
+                return []
+            # Joining inside the ranked query would read every match's row before the LIMIT.
+            rows = conn.execute(
+                f"SELECT {columns} FROM questions q WHERE q.id IN ({', '.join('?' * len(ranked))})",
+                [qid for qid, _rank in ranked],
+            ).fetchall()
+            by_id = {r[0]: r for r in rows}
+            return [
+                SearchResult(Question.from_row(by_id[qid]), float(rank), _snippet(by_id[qid][1], by_id[qid][7], terms))
+                for qid, rank in ranked
+                if qid in by_id
+            ]
+
+        patterns = []
+        for term in terms:
+            # \w+ terms can't hold % or \, but _ is a LIKE wildcard.
+            like = "%" + term.replace("_", "\\_") + "%"
+            patterns += [like, like]
+        where = " AND ".join(["(q.text LIKE ? ESCAPE '\\' OR q.notes LIKE ? ESCAPE '\\')"] * len(terms))
+        rows = conn.execute(
+            f"SELECT {columns} FROM questions q WHERE {where} ORDER BY q.id DESC LIMIT ?",
+            (*patterns, limit),
+        ).fetchall()
+    return [SearchResult(Question.from_row(r), 0.0, _snippet(r[1], r[7], terms)) for r in rows]
+
+
+@dataclass(frozen=True)
+class QuestionDelta:
+    changed: list[Question]  # oldest change first
+    deleted_ids: list[int]
+    cursor: object  # pass back as `since` on the next call
+
+
+def list_questions_since(since) -> QuestionDelta:
+    """Returns rows changed and ids deleted after `since`, plus the cursor for the next call.
+
+    `since` is a cursor from a previous call; None starts a new sync from now
+    without replaying history. Cursors follow commit order (see migration 13),
+    so a write that commits after a sync is never behind its cursor. A change
+    can be returned twice, so callers should apply deltas idempotently.
+    A deleted id that has been re-added shows up only as a changed row.
+    """
+    if _is_postgres():
+        with connection() as conn:
+            with conn.cursor() as cur:
+                # Every transaction older than the snapshot's xmin has finished, so the
+                # queries below see all of them; anything newer is read again next time.
+                cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+                cursor = cur.fetchone()[0]
+                if since is None:
+                    conn.rollback()
+                    return QuestionDelta(changed=[], deleted_ids=[], cursor=cursor)
+                cur.execute(
+                    """
+                    SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes
+                    FROM questions
+                    WHERE change_id >= %s::xid8
+                    ORDER BY change_id, id
+                    """,
+                    (since,),
+                )
+                changed = [Question.from_row(row) for row in cur.fetchall()]
+                cur.execute(
+                    """
+                    SELECT t.id FROM questions_tombstones t
+                    WHERE t.change_id >= %s::xid8 AND NOT EXISTS (SELECT 1 FROM questions q WHERE q.id = t.id)
+                    """,
+                    (since,),
+                )
+                deleted_ids = [r[0] for r in cur.fetchall()]
+            conn.rollback()
+        return QuestionDelta(changed=changed, deleted_ids=deleted_ids, cursor=cursor)
+
+    with connection() as conn:
+        # Read the clock first: every change numbered up to it has committed.
+        cursor = conn.execute("SELECT change_id FROM questions_change_clock").fetchone()[0]
+        if since is None:
+            return QuestionDelta(changed=[], deleted_ids=[], cursor=cursor)
+        changed = _question_cursor(conn).execute(
+            """
+            SELECT id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes
+            FROM questions
+            WHERE change_id > ?
+            ORDER BY change_id, id
+            """,
+            (since,),
+        ).fetchall()
+        deleted_ids = [
+            r[0]
+            for r in conn.execute(
+                """
+                SELECT t.id FROM questions_tombstones t
+                WHERE t.change_id > ? AND NOT EXISTS (SELECT 1 FROM questions q WHERE q.id = t.id)
+                """,
+                (since,),
+            ).fetchall()
+        ]
+    return QuestionDelta(changed=changed, deleted_ids=deleted_ids, cursor=cursor)
+
+
+def refresh_read_model() -> bool:
+    """Pulls other processes' writes into the read model and review indexes, at most once per sync interval."""
+
+    def load_since(since) -> QuestionDelta:
+        delta = list_questions_since(since)
+        # Reviews still queued in this process aren't in those rows yet.
+        pending = _pending_reviews()
+        if pending:
+            delta = replace(
+                delta, changed=[_with_pending_reviews(question, pending) for question in delta.changed]
+            )
+        for index in (get_review_queue(), get_due_sampler()):
+            for question in delta.changed:
+                index.upsert(question.id, question.last_reviewed, question.times_reviewed)
+            for question_id in delta.deleted_ids:
+                index.discard(question_id)
+        return delta
+
+    return get_read_model().sync(load_since, get_sync_interval())
 
 
 def delete_question(question_id: int) -> bool:
@@ -167,34 +850,76 @@ def delete_question(question_id: int) -> bool:
         return False
 
     if _is_postgres():
-        with connect() as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("DELETE FROM questions WHERE id = %s", (question_id,))
                 deleted = cur.rowcount
+                if deleted:
+                    cur.execute(
+                        """
+                        INSERT INTO questions_tombstones(id, deleted_at) VALUES (%s, NOW())
+                        ON CONFLICT (id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at, change_id = EXCLUDED.change_id
+                        """,
+                        (question_id,),
+                    )
+            conn.commit()
+    else:
+        with connection() as conn:
+            _bump_change_clock(conn)
+            cur = conn.execute("DELETE FROM questions WHERE id = ?", (question_id,))
+            deleted = cur.rowcount
+            if deleted:
+                conn.execute(
+                    f"""
+                    INSERT INTO questions_tombstones(id, deleted_at, change_id)
+                    VALUES (?, {_NOW_SQLITE}, {_CHANGE_ID_SQLITE})
+                    ON CONFLICT(id) DO UPDATE SET deleted_at = excluded.deleted_at, change_id = excluded.change_id
+                    """,
+                    (question_id,),
+                )
             conn.commit()
-        return deleted > 0
 
-    with connect() as conn:
-        cur = conn.execute("DELETE FROM questions WHERE id = ?", (question_id,))
-        conn.commit()
-        return cur.rowcount > 0
+    if deleted > 0:
+        _questions_changed([question_id])
+    return deleted > 0
 
 
 def delete_all_questions() -> None:
     if _is_postgres():
-        with connect() as conn:
+        with connection() as conn:
             with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO questions_tombstones(id, deleted_at) SELECT id, NOW() FROM questions
+                    ON CONFLICT (id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at, change_id = EXCLUDED.change_id
+                    """
+                )
                 cur.execute("TRUNCATE TABLE questions RESTART IDENTITY")
             conn.commit()
+        _questions_changed()
         return
 
-    with connect() as conn:
+    with connection() as conn:
+        _bump_change_clock(conn)
+        conn.execute(
+            f"""
+            INSERT INTO questions_tombstones(id, deleted_at, change_id)
+            SELECT id, {_NOW_SQLITE}, {_CHANGE_ID_SQLITE} FROM questions
+            WHERE true  -- SQLite needs a WHERE to parse ON CONFLICT after a SELECT
+            ON CONFLICT(id) DO UPDATE SET deleted_at = excluded.deleted_at, change_id = excluded.change_id
+            """
+        )
         conn.execute("DELETE FROM questions")
         conn.commit()
+    _questions_changed()
 
 
-def update_question(
-    question_id: int,
+# Columns update_question() may set, in the order SET clauses are written.
+_UPDATABLE_COLUMNS = ("text", "difficulty", "link", "notes", "last_reviewed", "times_reviewed")
+_REVIEW_COLUMNS = {"last_reviewed", "times_reviewed"}
+
+
+def _normalize_update_fields(
     *,
     text: str | None = None,
     difficulty: str | None = None,
@@ -202,14 +927,12 @@ def update_question(
     notes: str | None = None,
     last_reviewed: object | None = None,
     times_reviewed: object | None = None,
-) -> bool:
-    if not question_id:
-        return False
-
+) -> dict | None:
+    """Validates update_question() arguments; returns {column: value} to set, or None."""
     if text is not None:
         text = (text or "").strip()
         if not text:
-            return False
+            return None
 
     if difficulty is not None:
         difficulty = (difficulty or "unknown").strip().lower()
@@ -226,118 +949,380 @@ def update_question(
         try:
             times_reviewed = int(times_reviewed)
         except Exception:
-            return False
+            return None
         if times_reviewed < 0:
-            return False
+            return None
 
     if last_reviewed is not None:
         # Allow passing datetime objects (psycopg2 handles) or strings.
         if isinstance(last_reviewed, str):
             last_reviewed = last_reviewed.strip() or None
 
-    if (
-        text is None
-        and difficulty is None
-        and link is None
-        and notes is None
-        and last_reviewed is None
-        and times_reviewed is None
-    ):
+    values = {
+        "text": text,
+        "difficulty": difficulty,
+        "link": link,
+        "notes": notes,
+        "last_reviewed": last_reviewed,
+        "times_reviewed": times_reviewed,
+    }
+    fields = {col: values[col] for col in _UPDATABLE_COLUMNS if values[col] is not None}
+    return fields or None
+
+
+def update_question(
+    question_id: int,
+    *,
+    text: str | None = None,
+    difficulty: str | None = None,
+    link: str | None = None,
+    notes: str | None = None,
+    last_reviewed: object | None = None,
+    times_reviewed: object | None = None,
+) -> bool:
+    if not question_id:
         return False
 
+    fields = _normalize_update_fields(
+        text=text,
+        difficulty=difficulty,
+        link=link,
+        notes=notes,
+        last_reviewed=last_reviewed,
+        times_reviewed=times_reviewed,
+    )
+    if fields is None:
+        return False
+    touches_review = bool(_REVIEW_COLUMNS & fields.keys())
+    if touches_review:
+        # Queued reviews would otherwise land on top of the edited values.
+        flush_reviews()
+
     if _is_postgres():
-        sets: list[str] = []
-        params: list[object] = []
-        if text is not None:
-            sets.append("text = %s")
-            params.append(text)
-        if difficulty is not None:
-            sets.append("difficulty = %s")
-            params.append(difficulty)
-        if link is not None:
-            sets.append("link = %s")
-            params.append(link)
-        if notes is not None:
-            sets.append("notes = %s")
-            params.append(notes)
-        if last_reviewed is not None:
-            sets.append("last_reviewed = %s")
-            params.append(last_reviewed)
-        if times_reviewed is not None:
-            sets.append("times_reviewed = %s")
-            params.append(times_reviewed)
-        params.append(question_id)
-
-        with connect() as conn:
+        sets = [f"{col} = %s" for col in fields]
+        params = [*fields.values(), question_id]
+
+        with connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    f"UPDATE questions SET {', '.join(sets)} WHERE id = %s",
+                    f"UPDATE questions SET {', '.join(sets)}, updated_at = NOW(), change_id = {_CHANGE_ID_POSTGRES} "
+                    "WHERE id = %s",
                     tuple(params),
                 )
                 updated = cur.rowcount
+                review_state = None
+                if updated and touches_review:
+                    cur.execute(
+                        f"UPDATE questions SET next_due_at = {_NEXT_DUE_AT_POSTGRES} WHERE id = %s "
+                        "RETURNING last_reviewed, times_reviewed",
+                        (question_id,),
+                    )
+                    review_state = cur.fetchone()
             conn.commit()
+        if updated > 0:
+            _questions_changed([question_id])
+            _review_state_changed(question_id, review_state)
         return updated > 0
 
-    sets_sqlite: list[str] = []
-    params_sqlite: list[object] = []
-    if text is not None:
-        sets_sqlite.append("text = ?")
-        params_sqlite.append(text)
-    if difficulty is not None:
-        sets_sqlite.append("difficulty = ?")
-        params_sqlite.append(difficulty)
-    if link is not None:
-        sets_sqlite.append("link = ?")
-        params_sqlite.append(link)
-    if notes is not None:
-        sets_sqlite.append("notes = ?")
-        params_sqlite.append(notes)
-    if last_reviewed is not None:
-        sets_sqlite.append("last_reviewed = ?")
-        params_sqlite.append(last_reviewed)
-    if times_reviewed is not None:
-        sets_sqlite.append("times_reviewed = ?")
-        params_sqlite.append(times_reviewed)
-    params_sqlite.append(question_id)
+    sets_sqlite = [f"{col} = ?" for col in fields]
+    params_sqlite = [*fields.values(), question_id]
 
-    with connect() as conn:
+    with connection() as conn:
+        _bump_change_clock(conn)
         cur = conn.execute(
-            f"UPDATE questions SET {', '.join(sets_sqlite)} WHERE id = ?",
+            f"UPDATE questions SET {', '.join(sets_sqlite)}, updated_at = {_NOW_SQLITE}, "
+            f"change_id = {_CHANGE_ID_SQLITE} WHERE id = ?",
             tuple(params_sqlite),
         )
+        updated = cur.rowcount
+        review_state = None
+        if updated and touches_review:
+            review_state = conn.execute(
+                f"UPDATE questions SET next_due_at = {_NEXT_DUE_AT_SQLITE} WHERE id = ? "
+                "RETURNING last_reviewed, times_reviewed",
+                (question_id,),
+            ).fetchone()
         conn.commit()
-        return cur.rowcount > 0
+    if updated > 0:
+        _questions_changed([question_id])
+        _review_state_changed(question_id, review_state)
+    return updated > 0
 
 
-def mark_reviewed(question_id: int) -> bool:
-    if not question_id:
-        return False
+# Postgres types for the VALUES list of a bulk UPDATE ... FROM (VALUES ...).
+_PG_COLUMN_TYPES = {
+    "id": "integer",
+    "text": "text",
+    "difficulty": "text",
+    "link": "text",
+    "notes": "text",
+    "last_reviewed": "timestamptz",
+    "times_reviewed": "integer",
+}
+
+
+def update_questions_bulk(patches) -> list[bool]:
+    """Applies many update_question() patches in a single transaction.
+
+    `patches` is a sequence of (question_id, {field: value}) pairs using
+    update_question()'s keyword names. Patches that set the same columns are sent
+    as one batch (execute_values on Postgres, executemany on SQLite). Returns one
+    outcome per patch: True if its row was updated. Nothing is written if the
+    transaction fails.
+    """
+    patches = list(patches)
+    outcomes = [False] * len(patches)
+
+    # Merge repeated ids so each row is written once with its latest values.
+    merged: dict[int, dict] = {}
+    positions: dict[int, list[int]] = {}
+    for pos, (question_id, patch) in enumerate(patches):
+        try:
+            question_id = int(question_id)
+        except Exception:
+            continue
+        if question_id <= 0 or not isinstance(patch, dict) or not set(patch) <= set(_UPDATABLE_COLUMNS):
+            continue
+        fields = _normalize_update_fields(**patch)
+        if fields is None:
+            continue
+        merged.setdefault(question_id, {}).update(fields)
+        positions.setdefault(question_id, []).append(pos)
+
+    if not merged:
+        return outcomes
+    if any(_REVIEW_COLUMNS & fields.keys() for fields in merged.values()):
+        flush_reviews()
+
+    groups: dict[tuple[str, ...], list[int]] = {}
+    for question_id, fields in merged.items():
+        cols = tuple(col for col in _UPDATABLE_COLUMNS if col in fields)
+        groups.setdefault(cols, []).append(question_id)
 
+    updated_ids: set[int] = set()
     if _is_postgres():
-        with connect() as conn:
+        from psycopg2.extras import execute_values
+
+        with connection() as conn:
             with conn.cursor() as cur:
+                for cols, ids in groups.items():
+                    sets = ", ".join(f"{col} = v.{col}" for col in cols)
+                    template = "(" + ", ".join(f"%s::{_PG_COLUMN_TYPES[c]}" for c in ("id", *cols)) + ")"
+                    rows = [(qid, *(merged[qid][col] for col in cols)) for qid in ids]
+                    returned = execute_values(
+                        cur,
+                        f"UPDATE questions AS q SET {sets}, updated_at = NOW(), change_id = {_CHANGE_ID_POSTGRES} "
+                        f"FROM (VALUES %s) AS v(id, {', '.join(cols)}) "
+                        "WHERE q.id = v.id RETURNING q.id",
+                        rows,
+                        template=template,
+                        page_size=500,
+                        fetch=True,
+                    )
+                    group_updated = [r[0] for r in returned]
+                    updated_ids.update(group_updated)
+                    if group_updated and _REVIEW_COLUMNS & set(cols):
+                        cur.execute(
+                            f"UPDATE questions SET next_due_at = {_NEXT_DUE_AT_POSTGRES} WHERE id = ANY(%s)",
+                            (group_updated,),
+                        )
+            conn.commit()
+    else:
+        with connection() as conn:
+            # executemany reports only a total rowcount, so find existing ids up front.
+            all_ids = list(merged)
+            for marks, chunk in in_chunks(all_ids, "?"):
+                found = conn.execute(f"SELECT id FROM questions WHERE id IN ({marks})", chunk).fetchall()
+                updated_ids.update(r[0] for r in found)
+
+            if updated_ids:
+                _bump_change_clock(conn)
+            for cols, ids in groups.items():
+                ids = [qid for qid in ids if qid in updated_ids]
+                if not ids:
+                    continue
+                conn.executemany(
+                    f"UPDATE questions SET {', '.join(f'{col} = ?' for col in cols)}, updated_at = {_NOW_SQLITE}, "
+                    f"change_id = {_CHANGE_ID_SQLITE} WHERE id = ?",
+                    [(*(merged[qid][col] for col in cols), qid) for qid in ids],
+                )
+                if _REVIEW_COLUMNS & set(cols):
+                    conn.executemany(
+                        f"UPDATE questions SET next_due_at = {_NEXT_DUE_AT_SQLITE} WHERE id = ?",
+                        [(qid,) for qid in ids],
+                    )
+            conn.commit()
+
+    if updated_ids:
+        _questions_changed(updated_ids)
+    for question_id in updated_ids:
+        for pos in positions.get(question_id, []):
+            outcomes[pos] = True
+    return outcomes
+
+
+def _apply_review_events(events: list[ReviewEvent]) -> list[int]:
+    """Appends review events and folds them into the questions counters, in one transaction.
+
+    Counters move incrementally: times_reviewed grows by each question's event
+    count and last_reviewed only moves forward. Events for questions that no
+    longer exist (deleted after mark_reviewed() checked) are dropped and logged;
+    returns their ids.
+    """
+    latest: dict[int, datetime] = {}
+    counts: dict[int, int] = {}
+    for event in events:
+        counts[event.question_id] = counts.get(event.question_id, 0) + 1
+        if event.question_id not in latest or event.reviewed_at > latest[event.question_id]:
+            latest[event.question_id] = event.reviewed_at
+    question_ids = list(counts)
+
+    if _is_postgres():
+        from psycopg2.extras import execute_values
+
+        with connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    "INSERT INTO review_events(question_id, reviewed_at, outcome) "
+                    "SELECT v.question_id, v.reviewed_at, v.outcome "
+                    "FROM (VALUES %s) AS v(question_id, reviewed_at, outcome) "
+                    "WHERE EXISTS (SELECT 1 FROM questions q WHERE q.id = v.question_id)",
+                    [(e.question_id, e.reviewed_at, e.outcome) for e in events],
+                    template="(%s::integer, %s::timestamptz, %s::text)",
+                    page_size=500,
+                )
+                returned = execute_values(
+                    cur,
+                    "UPDATE questions AS q SET times_reviewed = COALESCE(q.times_reviewed, 0) + v.n, "
+                    "last_reviewed = GREATEST(q.last_reviewed, v.latest), updated_at = NOW(), "
+                    f"change_id = {_CHANGE_ID_POSTGRES} "
+                    "FROM (VALUES %s) AS v(id, n, latest) WHERE q.id = v.id RETURNING q.id",
+                    [(qid, counts[qid], latest[qid]) for qid in question_ids],
+                    template="(%s::integer, %s::integer, %s::timestamptz)",
+                    page_size=500,
+                    fetch=True,
+                )
+                matched = {r[0] for r in returned}
                 cur.execute(
-                    """
-                    UPDATE questions
-                    SET last_reviewed = NOW(),
-                        times_reviewed = COALESCE(times_reviewed, 0) + 1
-                    WHERE id = %s
-                    """,
-                    (question_id,),
+                    f"UPDATE questions SET next_due_at = {_NEXT_DUE_AT_POSTGRES} WHERE id = ANY(%s)",
+                    (question_ids,),
                 )
-                updated = cur.rowcount
             conn.commit()
-        return updated > 0
+    else:
+        with connection() as conn:
+            _bump_change_clock(conn)
+            # executemany reports only a total rowcount; the write lock is held, so this stays true.
+            matched = set()
+            for marks, chunk in in_chunks(question_ids, "?"):
+                found = conn.execute(f"SELECT id FROM questions WHERE id IN ({marks})", chunk).fetchall()
+                matched.update(r[0] for r in found)
+            conn.executemany(
+                "INSERT INTO review_events(question_id, reviewed_at, outcome) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM questions WHERE id = ?)",
+                [(e.question_id, _db_timestamp(e.reviewed_at), e.outcome, e.question_id) for e in events],
+            )
+            conn.executemany(
+                f"""
+                UPDATE questions
+                SET times_reviewed = COALESCE(times_reviewed, 0) + ?1,
+                    last_reviewed = CASE WHEN last_reviewed IS NULL OR last_reviewed < ?2 THEN ?2 ELSE last_reviewed END,
+                    updated_at = {_NOW_SQLITE},
+                    change_id = {_CHANGE_ID_SQLITE}
+                WHERE id = ?3
+                """,
+                [(counts[qid], _db_timestamp(latest[qid]), qid) for qid in question_ids],
+            )
+            conn.executemany(
+                f"UPDATE questions SET next_due_at = {_NEXT_DUE_AT_SQLITE} WHERE id = ?",
+                [(qid,) for qid in question_ids],
+            )
+            conn.commit()
 
-    with connect() as conn:
-        cur = conn.execute(
-            """
-            UPDATE questions
-            SET last_reviewed = CURRENT_TIMESTAMP,
-                times_reviewed = COALESCE(times_reviewed, 0) + 1
-            WHERE id = ?
-            """,
-            (question_id,),
-        )
-        conn.commit()
-        return cur.rowcount > 0
\ No newline at end of file
+    # The review queue and sampler were moved when the events were queued; only listings are stale.
+    get_read_model().invalidate(question_ids)
+    missing = [qid for qid in question_ids if qid not in matched]
+    if missing:
+        logger.warning("Dropped reviews of %d deleted question(s): %s", len(missing), missing[:20])
+        # Their queued state is gone with them.
+        _questions_changed(missing)
+    return missing
+
+
+@functools.cache
+def _review_writer() -> ReviewWriter:
+    return ReviewWriter(
+        _apply_review_events,
+        batch_size=get_review_batch_size(),
+        flush_interval_ms=get_review_flush_interval_ms(),
+        max_pending=get_review_max_pending(),
+    )
+
+
+def flush_reviews() -> int:
+    """Commits queued reviews now; returns how many were written."""
+    return _review_writer().flush()
+
+
+def _pending_reviews() -> dict[int, tuple[int, datetime]]:
+    """question_id -> (queued review count, latest reviewed_at) for reviews not yet committed."""
+    pending: dict[int, tuple[int, datetime]] = {}
+    for event in _review_writer().pending():
+        count, latest = pending.get(event.question_id, (0, event.reviewed_at))
+        pending[event.question_id] = (count + 1, max(latest, event.reviewed_at))
+    return pending
+
+
+def _with_pending_reviews(question: Question | None, pending: dict) -> Question | None:
+    """`question` as it will read once its queued reviews are committed."""
+    if question is None or question.id not in pending:
+        return question
+    count, latest = pending[question.id]
+    last_reviewed = latest if question.last_reviewed is None else max(question.last_reviewed, latest)
+    return Question(
+        question.id,
+        question.text,
+        question.difficulty,
+        question.created_at,
+        question.link,
+        last_reviewed,
+        question.times_reviewed + count,
+        question.notes,
+    )
+
+
+def mark_reviewed(question_id: int, outcome: str | None = None) -> bool:
+    """Records one review: an event in review_events plus the questions counters.
+
+    With the default "batch" durability the event is queued and committed by
+    the review writer within QUESTIONBANK_REVIEW_FLUSH_MS; "sync" commits before
+    returning. Either way the review queue and sampler move immediately, and
+    reads of this question include the review. Returns False if the question
+    doesn't exist. In batch mode True means the review is queued: if another
+    process deletes the question before the flush, the event is dropped and logged.
+    """
+    if not question_id:
+        return False
+    question_id = int(question_id)
+
+    # Read from the database, not the review queue, so a delete by another process is seen.
+    states = list_review_state([question_id])
+    if not states:
+        get_review_queue().discard(question_id)
+        get_due_sampler().discard(question_id)
+        return False
+    _qid, last_reviewed, times_reviewed = states[0]
+
+    # Whole seconds, as SQLite's CURRENT_TIMESTAMP stores them.
+    event = ReviewEvent(question_id, datetime.now(timezone.utc).replace(microsecond=0), outcome)
+    if get_review_durability() == "sync":
+        if _apply_review_events([event]):
+            return False
+    else:
+        _review_writer().enqueue(event)
+        get_read_model().invalidate([question_id])
+
+    if last_reviewed is None or event.reviewed_at > last_reviewed:
+        last_reviewed = event.reviewed_at
+    _review_state_changed(question_id, (last_reviewed, times_reviewed + 1))
+    return True
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from .models import Question
+
+_DISPLAY_TZ = "America/Los_Angeles"
+
+
+def build_library_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Turns a list_questions_frame() result into the library table, timestamps shown in Pacific time."""
+    df = frame.rename(columns={"text": "problem", "created_at": "date_added"})
+    df["difficulty"] = df["difficulty"].astype(object)
+    df["notes"] = df["notes"].fillna("")
+    for _col in ["date_added", "last_reviewed"]:
+        shown = df[_col].dt.tz_convert(_DISPLAY_TZ).dt.strftime("%Y-%m-%d %H:%M")
+        df[_col] = shown.astype(object).where(shown.notna(), "—")
+    return df[["id", "problem", "difficulty", "date_added", "link", "last_reviewed", "times_reviewed", "notes"]]
+
+
+class QuestionReadModel:
+    """Process-wide cache of what the pages read, dropped by questions_repo writes.
+
+    Holds the question count, library pages and filtered listings (the typed
+    frame plus its prebuilt, read-only display DataFrame) and an id -> Question
+    map for single-row lookups. Reads take loader functions so this module stays
+    independent of the repo that invalidates it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._count: int | None = None
+        self._pages: dict[tuple, tuple[pd.DataFrame, pd.DataFrame]] = {}
+        self._rows: dict[int, Question] = {}
+        self._sync_cursor = None
+        self._synced_at: float | None = None
+        self._syncing = False
+
+    def count(self, load) -> int:
+        with self._lock:
+            if self._count is not None:
+                return self._count
+            generation = self._generation
+        value = load()
+        with self._lock:
+            if generation == self._generation:
+                self._count = value
+        return value
+
+    def library_page(self, after, page_size: int, load) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Returns (frame, display frame) for one library page; `load(limit=, after=)` on a miss."""
+        return self._frame(("page", after, page_size), lambda: load(limit=page_size, after=after))
+
+    def filtered(self, filters: dict, load) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Returns (frame, display frame) for a filtered listing; `load(**filters)` on a miss."""
+        return self._frame(("query", *sorted(filters.items())), lambda: load(**filters))
+
+    def _frame(self, key: tuple, load) -> tuple[pd.DataFrame, pd.DataFrame]:
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                return cached
+            generation = self._generation
+        frame = load()
+        entry = (frame, build_library_frame(frame))
+        with self._lock:
+            # Skip storing if a write landed while we were loading.
+            if generation == self._generation:
+                self._pages[key] = entry
+        return entry
+
+    def get(self, question_id: int, load):
+        """Returns one Question by id, calling `load(question_id)` only when it isn't cached."""
+        question_id = int(question_id)
+        with self._lock:
+            row = self._rows.get(question_id)
+            if row is not None:
+                return row
+            generation = self._generation
+        row = load(question_id)
+        if row is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._rows[question_id] = row
+        return row
+
+    def sync(self, load_since, interval_s: float) -> bool:
+        """Applies writes made by other processes, via `load_since(cursor)`.
+
+        Runs at most once per `interval_s` and skips if another thread is already
+        syncing. Returns True if anything changed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._syncing or (self._synced_at is not None and now - self._synced_at < interval_s):
+                return False
+            self._syncing = True
+            generation = self._generation
+            cursor = self._sync_cursor
+        try:
+            delta = load_since(cursor)
+        except Exception:
+            with self._lock:
+                self._syncing = False
+            raise
+
+        with self._lock:
+            self._syncing = False
+            self._synced_at = time.monotonic()
+            self._sync_cursor = delta.cursor
+            if not delta.changed and not delta.deleted_ids:
+                return False
+            changed_ids = [question.id for question in delta.changed]
+            self.invalidate([*changed_ids, *delta.deleted_ids])
+            # A local write during the load may be newer than these rows; let it win.
+            if generation + 1 == self._generation:
+                for question_id, row in zip(changed_ids, delta.changed):
+                    self._rows[question_id] = row
+            return True
+
+    def invalidate(self, question_ids=None) -> None:
+        """Drops listings and the given rows (every row when `question_ids` is None)."""
+        with self._lock:
+            self._generation += 1
+            self._count = None
+            self._pages.clear()
+            if question_ids is None:
+                self._rows.clear()
+            else:
+                for question_id in question_ids:
+                    self._rows.pop(int(question_id), None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_read_model() -> QuestionReadModel:
+    return QuestionReadModel()
@@ -0,0 +1,120 @@
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Background flushes back off exponentially up to this, then stop after _MAX_RETRIES in a row.
+_MAX_BACKOFF_S = 30.0
+_MAX_RETRIES = 5
+
+
+@dataclass(frozen=True)
+class ReviewEvent:
+    question_id: int
+    reviewed_at: datetime  # UTC
+    outcome: str | None = None
+
+
+class ReviewWriter:
+    """Write-behind queue for review events.
+
+    enqueue() only appends to memory; a background thread hands the events to
+    `apply(events)` once `batch_size` are waiting or the oldest has waited
+    `flush_interval_ms`, so one transaction commits many reviews. A failed
+    batch is kept and retried with exponential backoff; after _MAX_RETRIES
+    failures in a row, or once `max_pending` events are waiting, enqueue()
+    stops queueing and writes on the calling thread, so the error reaches
+    the caller instead of the queue growing. Whatever is still queued at
+    interpreter exit is flushed then; a hard crash loses at most one batch.
+    """
+
+    def __init__(self, apply, *, batch_size: int, flush_interval_ms: float, max_pending: int):
+        self._apply = apply
+        self._batch_size = batch_size
+        self._interval_s = flush_interval_ms / 1000
+        self._max_pending = max_pending
+        self._failures = 0
+        self._cond = threading.Condition()
+        self._pending: list[ReviewEvent] = []
+        self._inflight: list[ReviewEvent] = []
+        self._oldest_at: float | None = None
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def pending(self) -> list[ReviewEvent]:
+        """Events not yet committed, including a batch that is being written right now."""
+        with self._cond:
+            return self._inflight + self._pending
+
+    def enqueue(self, event: ReviewEvent) -> None:
+        """Queues one event, or writes it (and the backlog) now if the writer is failing or full."""
+        with self._cond:
+            backed_up = len(self._pending) + len(self._inflight) >= self._max_pending
+            if self._failures < _MAX_RETRIES and not backed_up:
+                if not self._pending:
+                    self._oldest_at = time.monotonic()
+                self._pending.append(event)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+                if len(self._pending) >= self._batch_size:
+                    self._cond.notify()
+                return
+        # Synchronous fallback: raises to the caller if the database is still failing.
+        logger.warning("Review writer is %s; writing synchronously", "backed up" if backed_up else "failing")
+        self.flush()
+        self._apply([event])
+
+    def flush(self) -> int:
+        """Commits everything queued now, on the calling thread. Returns how many events were written."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending, self._oldest_at = self._pending, [], None
+                self._inflight = batch
+            if not batch:
+                return 0
+            try:
+                self._apply(batch)
+            except Exception:
+                with self._cond:
+                    # Put the batch back in front of anything queued meanwhile.
+                    self._pending[:0] = batch
+                    self._inflight = []
+                    self._oldest_at = time.monotonic()
+                    self._failures += 1
+                raise
+            with self._cond:
+                self._inflight = []
+                self._failures = 0
+            return len(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    # After _MAX_RETRIES failures the next enqueue() or flush() retries instead.
+                    if self._pending and self._failures < _MAX_RETRIES:
+                        wait_s = self._oldest_at + self._interval_s - time.monotonic()
+                        if len(self._pending) >= self._batch_size or wait_s <= 0:
+                            break
+                        self._cond.wait(wait_s)
+                    else:
+                        self._cond.wait()
+            try:
+                self.flush()
+            except Exception:
+                if self._failures >= _MAX_RETRIES:
+                    logger.exception(
+                        "Flushing review events failed %d times; %d left queued until the next review",
+                        self._failures,
+                        len(self._pending),
+                    )
+                    continue
+                backoff_s = min(self._interval_s * 2 ** (self._failures - 1), _MAX_BACKOFF_S)
+                logger.exception("Flushing review events failed; retrying in %.0f ms", backoff_s * 1000)
+                time.sleep(backoff_s)
@@ -1,20 +1,97 @@
 from __future__ import annotations
 
+import codecs
+import html
+import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from database import leetcode_repo
+from integrations.leetcode_catalog import ensure_catalog_seeded
 
 
 @dataclass(frozen=True)
 class LeetCodeProblemMetadata:
     problem_id: int | None
     title: str
+    difficulty: str | None = None  # "easy" / "medium" / "hard" when known
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    url: str
+    metadata: LeetCodeProblemMetadata | None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.metadata is not None
 
 
 _LEETCODE_HOST_SUFFIX = "leetcode.com"
+_GRAPHQL_URL = os.getenv("LEETCODE_GRAPHQL_URL", "https://leetcode.com/graphql")
+
+# Slugs packed into one aliased GraphQL request.
+DEFAULT_GRAPHQL_BATCH_SIZE = 20
+_USER_AGENT = "Mozilla/5.0 (compatible; questionbank-streamlit/1.0)"
+
+# Upper bound on concurrent lookups, and so on keep-alive connections per host.
+_MAX_WORKERS = 16
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Process-wide keep-alive session, so repeat lookups skip DNS/TCP/TLS setup."""
+    global _session
+    if _session is not None:
+        return _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=2,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "POST"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_MAX_WORKERS, max_retries=retry)
+            session = requests.Session()
+            session.headers["User-Agent"] = _USER_AGENT
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class _HostRateLimiter:
+    """Spaces requests to each host at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate: float | None):
+        self._interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        if not self._interval:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
 
 
 def is_leetcode_problem_url(raw: str) -> bool:
@@ -62,17 +139,80 @@ def _extract_problem_slug(url: str) -> str | None:
     return slug or None
 
 
-def _extract_title_from_html(html: str) -> str | None:
-    soup = BeautifulSoup(html, "html.parser")
+_ATTR_RE = re.compile(r"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+_TITLE_CLOSE_RE = re.compile(r"</title\s*>", re.IGNORECASE)
 
-    og = soup.find("meta", attrs={"property": "og:title"})
-    if og and og.get("content"):
-        return str(og.get("content")).strip()
+# Give up on pages whose <head> is implausibly large.
+_MAX_TITLE_SCAN_BYTES = 1024 * 1024
 
-    if soup.title and soup.title.string:
-        return str(soup.title.string).strip()
 
-    return None
+class _TitleScanner:
+    """Incremental scanner that finds og:title or <title> without building a DOM.
+
+    Feed it text chunks; it returns the title as soon as either appears and
+    keeps only the unscanned tail of the input in memory.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self.done = False
+
+    def feed(self, text: str) -> str | None:
+        self._buf += text
+        pos = 0
+        try:
+            while True:
+                lt = self._buf.find("<", pos)
+                if lt < 0:
+                    pos = len(self._buf)
+                    return None
+                gt = self._buf.find(">", lt)
+                if gt < 0:
+                    pos = lt
+                    return None
+
+                tag = self._buf[lt + 1 : gt]
+                name = tag.split(None, 1)[0].lower() if tag.strip() else ""
+                if name == "meta":
+                    attrs = {
+                        m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3) or m.group(4)
+                        for m in _ATTR_RE.finditer(tag)
+                    }
+                    content = (attrs.get("content") or "").strip()
+                    if attrs.get("property", "").lower() == "og:title" and content:
+                        self.done = True
+                        return html.unescape(content)
+                elif name == "title":
+                    close = _TITLE_CLOSE_RE.search(self._buf, gt + 1)
+                    if close is None:
+                        pos = lt
+                        return None
+                    title = html.unescape(self._buf[gt + 1 : close.start()]).strip()
+                    if title:
+                        self.done = True
+                        return title
+                    pos = close.end()
+                    continue
+                elif name in ("/head", "body"):
+                    # Titles only live in <head>; don't read the rest of the page.
+                    self.done = True
+                    return None
+                pos = gt + 1
+        finally:
+            self._buf = self._buf[pos:]
+
+
+def _extract_title_from_chunks(chunks, encoding: str | None = None) -> str | None:
+    """Scans an iterable of byte chunks and stops reading once a title is found."""
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    scanner = _TitleScanner()
+    seen = 0
+    for chunk in chunks:
+        seen += len(chunk)
+        title = scanner.feed(decoder.decode(chunk))
+        if title or scanner.done or seen > _MAX_TITLE_SCAN_BYTES:
+            return title
+    return scanner.feed(decoder.decode(b"", final=True))
 
 
 _TITLE_RE = re.compile(r"^\s*(?P<num>\d+)\.\s*(?P<name>.*?)\s*-\s*LeetCode\s*$", re.IGNORECASE)
@@ -89,70 +229,347 @@ def _parse_title(title: str) -> LeetCodeProblemMetadata:
     return LeetCodeProblemMetadata(problem_id=None, title=cleaned or title)
 
 
-def _fetch_via_graphql(url: str, *, timeout_s: float = 15.0) -> LeetCodeProblemMetadata:
-    slug = _extract_problem_slug(url)
-    if not slug:
-        return LeetCodeProblemMetadata(problem_id=None, title=url)
-
-    gql_url = "https://leetcode.com/graphql"
-    query = """
-    query getQuestionDetail($titleSlug: String!) {
-      question(titleSlug: $titleSlug) {
-        questionFrontendId
-        title
-      }
-    }
-    """.strip()
+def _metadata_from_graphql(question: dict, slug: str) -> LeetCodeProblemMetadata:
+    title = (question.get("title") or "").strip() or slug
+    frontend_id = (question.get("questionFrontendId") or "").strip()
+    problem_id = None
+    try:
+        if frontend_id:
+            problem_id = int(frontend_id)
+    except Exception:
+        problem_id = None
+
+    difficulty = (question.get("difficulty") or "").strip().lower() or None
+    return LeetCodeProblemMetadata(problem_id=problem_id, title=title, difficulty=difficulty)
+
+
+def _fetch_graphql_batch(
+    slugs: list[str],
+    *,
+    timeout_s: float = 15.0,
+    limiter: _HostRateLimiter | None = None,
+) -> dict[str, LeetCodeProblemMetadata | None]:
+    """Resolves many slugs in one GraphQL request, one aliased question() per slug.
+
+    A slug maps to None when LeetCode doesn't know it. Transport errors raise.
+    """
+    slugs = list(dict.fromkeys(slugs))
+    if not slugs:
+        return {}
+
+    variables = ", ".join(f"$s{i}: String!" for i in range(len(slugs)))
+    fields = "\n".join(
+        f"  q{i}: question(titleSlug: $s{i}) {{ questionFrontendId title difficulty }}"
+        for i in range(len(slugs))
+    )
+    query = f"query getQuestions({variables}) {{\n{fields}\n}}"
 
     headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; questionbank-streamlit/1.0)",
         "Accept": "application/json",
         "Content-Type": "application/json",
-        "Referer": f"https://leetcode.com/problems/{slug}/",
+        "Referer": f"https://leetcode.com/problems/{slugs[0]}/",
         "Origin": "https://leetcode.com",
     }
 
-    payload = {"query": query, "variables": {"titleSlug": slug}}
-    resp = requests.post(gql_url, json=payload, headers=headers, timeout=timeout_s)
+    payload = {"query": query, "variables": {f"s{i}": slug for i, slug in enumerate(slugs)}}
+    if limiter is not None:
+        limiter.wait(_GRAPHQL_URL)
+    resp = _get_session().post(_GRAPHQL_URL, json=payload, headers=headers, timeout=timeout_s)
     resp.raise_for_status()
     data = resp.json() or {}
 
-    question = (data.get("data") or {}).get("question")
-    if not question:
-        # Sometimes LeetCode returns errors for bad slugs
-        return LeetCodeProblemMetadata(problem_id=None, title=slug)
+    answers = data.get("data")
+    if answers is None:
+        # No data at all means the request itself was rejected, not that slugs are bad.
+        raise RuntimeError(f"LeetCode GraphQL error: {data.get('errors')}")
 
-    title = (question.get("title") or "").strip() or slug
-    frontend_id = (question.get("questionFrontendId") or "").strip()
-    problem_id = None
-    try:
-        if frontend_id:
-            problem_id = int(frontend_id)
-    except Exception:
-        problem_id = None
+    # Sometimes LeetCode returns errors for bad slugs; their alias is null.
+    return {
+        slug: _metadata_from_graphql(answers[f"q{i}"], slug) if answers.get(f"q{i}") else None
+        for i, slug in enumerate(slugs)
+    }
 
-    return LeetCodeProblemMetadata(problem_id=problem_id, title=title)
 
+def _fetch_via_graphql(
+    url: str,
+    *,
+    timeout_s: float = 15.0,
+    limiter: _HostRateLimiter | None = None,
+) -> LeetCodeProblemMetadata | None:
+    """Returns None when the URL has no slug or LeetCode doesn't know it."""
+    slug = _extract_problem_slug(url)
+    if not slug:
+        return None
+    return _fetch_graphql_batch([slug], timeout_s=timeout_s, limiter=limiter)[slug]
 
-def fetch_leetcode_problem_metadata(url: str, *, timeout_s: float = 15.0) -> LeetCodeProblemMetadata:
-    """Fetches minimal metadata (problem number + title) from a LeetCode problem URL.
 
-    Uses the page title / og:title. Does not scrape the problem statement.
-    """
+def _fetch_via_html(
+    url: str,
+    *,
+    timeout_s: float = 15.0,
+    limiter: _HostRateLimiter | None = None,
+) -> LeetCodeProblemMetadata | None:
     headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; questionbank-streamlit/1.0)",
         "Accept-Language": "en-US,en;q=0.9",
     }
 
-    resp = requests.get(url, headers=headers, timeout=timeout_s)
-    if resp.status_code == 403:
-        # LeetCode often blocks HTML fetches; GraphQL usually works without auth.
-        return _fetch_via_graphql(url, timeout_s=timeout_s)
-    resp.raise_for_status()
+    if limiter is not None:
+        limiter.wait(url)
+    # Stream so we can hang up once the title has gone by instead of downloading the page.
+    resp = _get_session().get(url, headers=headers, timeout=timeout_s, stream=True)
+    try:
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        title = _extract_title_from_chunks(resp.iter_content(chunk_size=8192), resp.encoding)
+    finally:
+        resp.close()
 
-    title = _extract_title_from_html(resp.text)
     if title:
         return _parse_title(title)
+    return None
 
-    # Fallback if HTML structure changes.
-    return _fetch_via_graphql(url, timeout_s=timeout_s)
+
+def _lookup(
+    url: str,
+    *,
+    timeout_s: float = 15.0,
+    limiter: _HostRateLimiter | None = None,
+) -> LeetCodeProblemMetadata | None:
+    """Network lookup, GraphQL first; None means LeetCode has no such problem.
+
+    The problem page is only fetched when there is no slug or GraphQL fails.
+    """
+    if _extract_problem_slug(url):
+        try:
+            return _fetch_via_graphql(url, timeout_s=timeout_s, limiter=limiter)
+        except Exception:
+            pass
+    return _fetch_via_html(url, timeout_s=timeout_s, limiter=limiter)
+
+
+def _not_found_metadata(url: str) -> LeetCodeProblemMetadata:
+    return LeetCodeProblemMetadata(problem_id=None, title=_extract_problem_slug(url) or url)
+
+
+def fetch_leetcode_problem_metadata(
+    url: str,
+    *,
+    timeout_s: float = 15.0,
+    limiter: _HostRateLimiter | None = None,
+) -> LeetCodeProblemMetadata:
+    """Fetches minimal metadata (problem number + title) from a LeetCode problem URL.
+
+    Asks LeetCode's GraphQL API first and falls back to the page title / og:title.
+    Does not scrape the problem statement. Always hits the network; see get_problem_metadata() for the cached path.
+    """
+    return _lookup(url, timeout_s=timeout_s, limiter=limiter) or _not_found_metadata(url)
+
+
+# Cache lifetimes, in seconds. Problem titles essentially never change; unknown
+# slugs are retried sooner in case they were typos LeetCode later fills in.
+_CACHE_TTL_S = float(os.getenv("LEETCODE_CACHE_TTL_S", str(30 * 24 * 3600)))
+_NEGATIVE_CACHE_TTL_S = float(os.getenv("LEETCODE_NEGATIVE_CACHE_TTL_S", str(24 * 3600)))
+_LRU_SIZE = int(os.getenv("LEETCODE_CACHE_LRU_SIZE", "2048"))
+
+
+@dataclass(frozen=True)
+class _CacheEntry:
+    metadata: LeetCodeProblemMetadata | None  # None: negative entry
+    fetched_at: float
+
+    def is_fresh(self, now: float) -> bool:
+        ttl = _CACHE_TTL_S if self.metadata is not None else _NEGATIVE_CACHE_TTL_S
+        return now - self.fetched_at < ttl
+
+
+class _LRUCache:
+    def __init__(self, maxsize: int):
+        self._maxsize = max(1, maxsize)
+        self._data: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> _CacheEntry | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: _CacheEntry) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+
+_lru = _LRUCache(_LRU_SIZE)
+
+
+def _cached_entries(slugs: list[str]) -> dict[str, _CacheEntry]:
+    """Fresh entries from the in-memory LRU, the offline catalog, then the shared cache table."""
+    now = time.time()
+    hits: dict[str, _CacheEntry] = {}
+    missing = []
+    for slug in slugs:
+        entry = _lru.get(slug)
+        if entry is not None and entry.is_fresh(now):
+            hits[slug] = entry
+        else:
+            missing.append(slug)
+
+    if missing:
+        try:
+            ensure_catalog_seeded()
+            known = leetcode_repo.get_catalog_entries(missing)
+        except Exception:
+            known = {}
+        for slug, (frontend_id, title, difficulty) in known.items():
+            entry = _CacheEntry(LeetCodeProblemMetadata(problem_id=frontend_id, title=title, difficulty=difficulty), now)
+            _lru.put(slug, entry)
+            hits[slug] = entry
+        missing = [slug for slug in missing if slug not in known]
+
+    if missing:
+        try:
+            rows = leetcode_repo.get_cached_metadata_many(missing)
+        except Exception:
+            # A cache that can't be read is just a miss.
+            rows = {}
+        for slug, (problem_id, title, difficulty, found, fetched_at) in rows.items():
+            metadata = (
+                LeetCodeProblemMetadata(problem_id=problem_id, title=title, difficulty=difficulty)
+                if found
+                else None
+            )
+            entry = _CacheEntry(metadata, fetched_at)
+            if entry.is_fresh(now):
+                _lru.put(slug, entry)
+                hits[slug] = entry
+    return hits
+
+
+def _store_entries(entries: dict[str, _CacheEntry]) -> None:
+    for slug, entry in entries.items():
+        _lru.put(slug, entry)
+    try:
+        leetcode_repo.put_cached_metadata_many(
+            [
+                (
+                    slug,
+                    e.metadata.problem_id if e.metadata else None,
+                    e.metadata.title if e.metadata else None,
+                    e.metadata.difficulty if e.metadata else None,
+                    e.metadata is not None,
+                    e.fetched_at,
+                )
+                for slug, e in entries.items()
+            ]
+        )
+    except Exception:
+        pass
+
+
+def get_problem_metadata(url: str, *, timeout_s: float = 15.0) -> LeetCodeProblemMetadata:
+    """Like fetch_leetcode_problem_metadata(), but cached by problem slug.
+
+    Checks an in-process LRU, the offline leetcode_catalog, then the
+    leetcode_metadata_cache table shared by every app instance, and only then
+    the network. Unknown slugs are cached too.
+    """
+    slug = _extract_problem_slug(url)
+    if not slug:
+        return fetch_leetcode_problem_metadata(url, timeout_s=timeout_s)
+
+    entry = _cached_entries([slug]).get(slug)
+    if entry is None:
+        entry = _CacheEntry(_lookup(url, timeout_s=timeout_s), time.time())
+        _store_entries({slug: entry})
+    return entry.metadata or _not_found_metadata(url)
+
+
+def fetch_many(
+    urls: list[str],
+    *,
+    max_workers: int = 8,
+    rate_limit: float | None = 4.0,
+    timeout_s: float = 15.0,
+    use_cache: bool = True,
+    batch_size: int = DEFAULT_GRAPHQL_BATCH_SIZE,
+) -> list[FetchResult]:
+    """Resolves many problem URLs concurrently over the shared keep-alive session.
+
+    Uncached slugs are resolved `batch_size` at a time through aliased GraphQL
+    requests, so N problems cost about N / batch_size requests. A URL falls
+    back to its HTML page only if it has no slug or its batch failed.
+    `rate_limit` caps requests per second to each host (None disables it).
+    Results come back in input order; a failed URL gets an error instead of
+    raising, so one bad link doesn't sink the batch. With `use_cache`, slugs
+    already cached are answered without a request and new answers are stored.
+    """
+    limiter = _HostRateLimiter(rate_limit)
+    unique = list(dict.fromkeys(urls))
+    if not unique:
+        return []
+
+    slugs = {url: _extract_problem_slug(url) for url in unique}
+    cached = _cached_entries([s for s in slugs.values() if s]) if use_cache else {}
+
+    by_url: dict[str, FetchResult] = {}
+    new_entries: dict[str, _CacheEntry] = {}
+    pending_slugs: list[str] = []
+    html_urls: list[str] = []
+    for url in unique:
+        slug = slugs[url]
+        if slug is None:
+            html_urls.append(url)
+        elif slug in cached:
+            by_url[url] = FetchResult(url, cached[slug].metadata or _not_found_metadata(url))
+        elif slug not in pending_slugs:
+            pending_slugs.append(slug)
+
+    def _batch(batch: list[str]) -> dict[str, LeetCodeProblemMetadata | None] | None:
+        try:
+            return _fetch_graphql_batch(batch, timeout_s=timeout_s, limiter=limiter)
+        except Exception:
+            return None
+
+    def _html(url: str) -> FetchResult:
+        try:
+            metadata = _fetch_via_html(url, timeout_s=timeout_s, limiter=limiter)
+        except Exception as e:
+            return FetchResult(url, None, str(e))
+        if slugs[url]:
+            new_entries[slugs[url]] = _CacheEntry(metadata, time.time())
+        return FetchResult(url, metadata or _not_found_metadata(url))
+
+    size = max(1, batch_size)
+    batches = [pending_slugs[i : i + size] for i in range(0, len(pending_slugs), size)]
+    workers = max(1, min(max_workers, _MAX_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="leetcode-fetch") as pool:
+        resolved: dict[str, LeetCodeProblemMetadata | None] = {}
+        for batch, answers in zip(batches, pool.map(_batch, batches)):
+            if answers is None:
+                continue
+            resolved.update(answers)
+            now = time.time()
+            for slug in batch:
+                new_entries[slug] = _CacheEntry(answers[slug], now)
+
+        for url in unique:
+            slug = slugs[url]
+            if url in by_url or slug is None:
+                continue
+            if slug in resolved:
+                by_url[url] = FetchResult(url, resolved[slug] or _not_found_metadata(url))
+            else:
+                html_urls.append(url)
+
+        for url, result in zip(html_urls, pool.map(_html, html_urls)):
+            by_url[url] = result
+
+    if use_cache and new_entries:
+        _store_entries(new_entries)
+
+    return [by_url[url] for url in urls]
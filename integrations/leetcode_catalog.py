@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+from database import leetcode_repo
+from database.db import init_db
+
+_DIFFICULTY_LEVELS = {1: "easy", 2: "medium", 3: "hard"}
+# Public, unauthenticated list of every problem; the same shape load_snapshot() accepts.
+_PROBLEMS_URL = os.getenv("LEETCODE_PROBLEMS_URL", "https://leetcode.com/api/problems/all/")
+_USER_AGENT = "Mozilla/5.0 (compatible; questionbank-streamlit/1.0)"
+
+_seed_lock = threading.Lock()
+_seeded = False
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    slug: str
+    frontend_id: int | None
+    title: str
+    difficulty: str | None
+
+
+def get_catalog_path() -> str:
+    return os.getenv("LEETCODE_CATALOG_PATH", "leetcode_catalog.json")
+
+
+def _as_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry_from_record(record: dict) -> CatalogEntry | None:
+    # LeetCode's /api/problems/all/ shape: {"stat": {...}, "difficulty": {"level": 1}}
+    if isinstance(record.get("stat"), dict):
+        stat = record["stat"]
+        slug = stat.get("question__title_slug")
+        frontend_id = _as_int(stat.get("frontend_question_id"))
+        title = stat.get("question__title")
+        difficulty = _DIFFICULTY_LEVELS.get((record.get("difficulty") or {}).get("level"))
+    else:
+        slug = record.get("slug") or record.get("titleSlug")
+        frontend_id = _as_int(record.get("frontend_id", record.get("questionFrontendId", record.get("id"))))
+        title = record.get("title")
+        difficulty = (record.get("difficulty") or "").strip().lower() or None
+
+    slug = (slug or "").strip()
+    title = (title or "").strip()
+    if not slug or not title:
+        return None
+    return CatalogEntry(slug=slug, frontend_id=frontend_id, title=title, difficulty=difficulty)
+
+
+def load_snapshot(path: str) -> list[CatalogEntry]:
+    """Reads a catalog snapshot.
+
+    Accepts a JSON list of {slug, frontend_id, title, difficulty} objects, or the
+    response of https://leetcode.com/api/problems/all/ saved as-is.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return _entries_from_snapshot(data)
+
+
+def _entries_from_snapshot(data) -> list[CatalogEntry]:
+    records = data.get("stat_status_pairs", []) if isinstance(data, dict) else data
+    entries = (_entry_from_record(r) for r in records if isinstance(r, dict))
+    return [e for e in entries if e is not None]
+
+
+def download_snapshot(path: str, *, timeout_s: float = 30.0) -> list[CatalogEntry]:
+    """Fetches LeetCode's public problem list, saves it to `path` as-is and returns its entries."""
+    resp = requests.get(_PROBLEMS_URL, headers={"User-Agent": _USER_AGENT}, timeout=timeout_s)
+    resp.raise_for_status()
+    data = resp.json()
+    entries = _entries_from_snapshot(data)
+    if not entries:
+        raise ValueError(f"{_PROBLEMS_URL} returned no problems")
+    # Write then rename, so a failed download never truncates the previous snapshot.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+    return entries
+
+
+def refresh_catalog(path: str | None = None) -> tuple[int, int]:
+    """Merges a snapshot into the leetcode_catalog table; returns (inserted, updated).
+
+    With no `path`, downloads the public problem list to get_catalog_path() first.
+    """
+    init_db()
+    entries = load_snapshot(path) if path else download_snapshot(get_catalog_path())
+    return leetcode_repo.merge_catalog([(e.slug, e.frontend_id, e.title, e.difficulty) for e in entries])
+
+
+def find_problem(*, frontend_id: int | None = None, title: str | None = None) -> CatalogEntry | None:
+    """Offline lookup by problem number or (case-insensitive) title."""
+    ensure_catalog_seeded()
+    row = leetcode_repo.find_catalog_entry(frontend_id=frontend_id, title=title)
+    return CatalogEntry(*row) if row else None
+
+
+def problem_url(entry: CatalogEntry) -> str:
+    return f"https://leetcode.com/problems/{entry.slug}/"
+
+
+def ensure_catalog_seeded() -> None:
+    """Loads the snapshot at get_catalog_path() once per process if the catalog table is empty.
+
+    No snapshot ships with the app; `python -m integrations.leetcode_catalog refresh`
+    downloads one. A failed seed is retried on the next lookup.
+    """
+    global _seeded
+    if _seeded:
+        return
+    with _seed_lock:
+        if _seeded:
+            return
+        path = get_catalog_path()
+        if Path(path).is_file() and leetcode_repo.count_catalog() == 0:
+            refresh_catalog(path)
+        _seeded = True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m integrations.leetcode_catalog",
+        description="Maintain the offline LeetCode problem catalog.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    refresh = sub.add_parser(
+        "refresh",
+        help="merge a newer snapshot into the catalog",
+        description=(
+            f"Without PATH, downloads the public problem list from {_PROBLEMS_URL}, saves it to "
+            "$LEETCODE_CATALOG_PATH (default leetcode_catalog.json) for later seeding, and merges it. "
+            "With PATH, merges that local snapshot and makes no network call."
+        ),
+    )
+    refresh.add_argument("path", nargs="?", default=None, help="local snapshot JSON to merge instead of downloading")
+    args = parser.parse_args(argv)
+
+    source = args.path or _PROBLEMS_URL
+    inserted, updated = refresh_catalog(args.path)
+    print(f"Catalog refreshed from {source}: {inserted} new, {updated} changed, {leetcode_repo.count_catalog()} total.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,25 @@
 import streamlit as st
 
-import random
-from datetime import datetime, timezone
-
-import pandas as pd
-
-from database.db import connect, init_db
-from database.questions_repo import get_question_by_id, get_random_question, list_questions, mark_reviewed, update_question
-
-
-def check_db_connection() -> tuple[bool, str | None]:
-    try:
-        conn = connect()
-        cur = conn.cursor()
-        cur.execute("SELECT 1;")
-        _ = cur.fetchone()
-        cur.close()
-        conn.close()
-        return True, None
-    except Exception as e:
-        return False, str(e)
+from zoneinfo import ZoneInfo
+
+from database.db import check_db_connection, init_db, pool_stats
+from database.instrumentation import begin_rerun, render_debug_panel
+from database.questions_repo import (
+    get_question_by_id,
+    get_review_context,
+    list_review_state,
+    mark_reviewed,
+    refresh_read_model,
+    update_question,
+)
+from scheduling.queue import get_review_queue
+from scheduling.sampler import get_due_sampler
+from scheduling.scoring import due_score, pick_due_with_randomness
 
 
 st.title("Review")
 
+begin_rerun()
 ok, err = check_db_connection()
 if ok:
     st.sidebar.success("Database connection: OK")
@@ -36,6 +32,7 @@ st.sidebar.divider()
 st.sidebar.caption("built with :heart: by Amir Hossein Farzaneh")
 
 init_db()
+refresh_read_model()
 
 if "review_candidate_id" not in st.session_state:
     st.session_state["review_candidate_id"] = None
@@ -47,66 +44,29 @@ if "review_show_notes_qid" not in st.session_state:
     st.session_state["review_show_notes_qid"] = None
 
 
-def _due_score(last_reviewed_value, times_reviewed_value) -> float:
-    """Higher means more due."""
-    reviewed_count = 0
-    try:
-        if times_reviewed_value is not None:
-            reviewed_count = int(times_reviewed_value)
-    except Exception:
-        reviewed_count = 0
-
-    reviewed_count = max(0, reviewed_count)
-    interval_days = 2 ** reviewed_count
-
-    lr = pd.to_datetime(last_reviewed_value, utc=True, errors="coerce")
-    if pd.isna(lr):
-        days_since = 10000.0
-    else:
-        now = datetime.now(timezone.utc)
-        days_since = max(0.0, (now - lr.to_pydatetime()).total_seconds() / 86400.0)
-
-    return float(days_since / interval_days)
-
-
-def _pick_most_due(rows):
-    if not rows:
-        return None, None
-
-    scored = []
-    for r in rows:
-        # r: (id, text, difficulty, created_at, link, last_reviewed, times_reviewed, notes)
-        score = _due_score(r[5], r[6])
-        scored.append((score, r))
-
-    scored.sort(key=lambda x: (x[0], -(x[1][6] or 0)), reverse=True)
-    best_score, best_row = scored[0]
-    return best_row, best_score
-
-
-def _pick_due_with_randomness(rows, *, top_k: int = 10):
-    if not rows:
-        return None, None
-
-    scored = []
-    for r in rows:
-        score = _due_score(r[5], r[6])
-        scored.append((score, r))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = scored[: max(1, min(top_k, len(scored)))]
-
-    weights = [max(0.0001, s) for s, _ in top]
-    chosen_score, chosen_row = random.choices(top, weights=weights, k=1)[0]
-    return chosen_row, chosen_score
-
 col_a, col_b, col_c = st.columns([1, 1, 2])
 with col_a:
     pick_new = st.button("New random", key="review_pick_new_random")
+    random_difficulty = st.selectbox(
+        "Random difficulty",
+        ["any", "easy", "medium", "hard", "unknown"],
+        index=0,
+        key="review_random_difficulty",
+    )
 
 with col_b:
     pick_intel_1 = st.button("Intelligent Pick 1", key="review_pick_intel_1")
     pick_intel_2 = st.button("Intelligent Pick 2", key="review_pick_intel_2")
+    pick_weighted = st.button("Weighted pick", key="review_pick_weighted")
+    weighted_temperature = st.slider(
+        "Temperature",
+        min_value=0.1,
+        max_value=10.0,
+        value=1.0,
+        step=0.1,
+        help="Low: almost always the most due question. 1: proportional to due score. High: close to uniform.",
+        key="review_weighted_temperature",
+    )
 
 with col_c:
     with st.form("pick_by_id_form"):
@@ -121,101 +81,131 @@ if pick_by_id:
         st.session_state["review_candidate_id"] = int(pick_id)
         st.rerun()
 
+if pick_weighted:
+    chosen_id = get_due_sampler().sample(list_review_state, temperature=weighted_temperature)
+    if chosen_id is None:
+        st.info("No questions yet. Add one on the Home page.")
+    else:
+        st.session_state["review_candidate_id"] = int(chosen_id)
+        st.rerun()
+
 if pick_intel_1 or pick_intel_2:
-    all_rows = list_questions(limit=5000)
+    # Served from the in-process review queue; the database is read only to build it.
+    review_queue = get_review_queue()
     if pick_intel_1:
-        chosen, _score = _pick_most_due(all_rows)
+        most_due = review_queue.peek(list_review_state)
+        chosen_id = most_due.id if most_due else None
     else:
-        chosen, _score = _pick_due_with_randomness(all_rows, top_k=10)
+        top_items = review_queue.top_k(10, list_review_state)
+        chosen_id, _score = pick_due_with_randomness(
+            [item.id for item in top_items],
+            [item.last_reviewed for item in top_items],
+            [item.times_reviewed for item in top_items],
+            k=10,
+        )
 
-    if chosen is None:
+    if chosen_id is None:
         st.info("No questions yet. Add one on the Home page.")
     else:
-        st.session_state["review_candidate_id"] = int(chosen[0])
+        st.session_state["review_candidate_id"] = int(chosen_id)
         st.rerun()
 
-row = None
-if not pick_new and st.session_state["review_candidate_id"] is not None:
-    for r in list_questions(limit=200):
-        if int(r[0]) == int(st.session_state["review_candidate_id"]):
-            row = r
-            break
+# One query at most: the candidate (often already cached), else a random question.
+# The difficulty filter belongs to "New random"; replacing a deleted candidate takes any question.
+candidate_id = st.session_state["review_candidate_id"]
+new_difficulty = None if random_difficulty == "any" or not pick_new else random_difficulty
+context = get_review_context(None if pick_new else candidate_id, new_difficulty)
+no_match = new_difficulty is not None and context.question is None
+if no_match:
+    st.info(f"No {new_difficulty} questions.")
+    if candidate_id is not None:
+        # Keep showing the current question.
+        context = get_review_context(candidate_id)
+row = context.question
+st.session_state["review_candidate_id"] = row.id if row else None
+if context.missing_id is not None:
+    st.info(f"Question #{context.missing_id} is no longer in the bank; showing a random one instead.")
 
 if row is None:
-    row = get_random_question()
-    st.session_state["review_candidate_id"] = row[0] if row else None
-
-if row is None:
-    st.info("No questions yet. Add one on the Home page.")
+    if not no_match:
+        st.info("No questions yet. Add one on the Home page.")
 else:
-    qid, text, diff, created_at, link, last_reviewed, times_reviewed, notes = row
-
     # Hide notes when switching to a new question, until user explicitly reveals them.
-    if st.session_state.get("review_show_notes_qid") != int(qid):
-        st.session_state["review_show_notes_qid"] = int(qid)
+    if st.session_state.get("review_show_notes_qid") != row.id:
+        st.session_state["review_show_notes_qid"] = row.id
         st.session_state["review_show_notes"] = False
 
-    score = _due_score(last_reviewed, times_reviewed)
+    score = due_score(row.last_reviewed, row.times_reviewed)
 
-    st.markdown(f"### #{qid} — {text}")
+    st.markdown(f"### #{row.id} — {row.text}")
 
-    last_reviewed_pt = pd.to_datetime(last_reviewed, utc=True, errors="coerce")
-    if pd.isna(last_reviewed_pt):
+    if row.last_reviewed is None:
         last_reviewed_display = "—"
     else:
-        last_reviewed_display = last_reviewed_pt.tz_convert("America/Los_Angeles").strftime("%Y-%m-%d %H:%M")
+        last_reviewed_display = row.last_reviewed.astimezone(ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d %H:%M")
 
     meta_cols = st.columns(2)
-    meta_cols[0].caption(f"Times reviewed: {times_reviewed or 0}")
+    meta_cols[0].caption(f"Times reviewed: {row.times_reviewed}")
     meta_cols[1].caption(f"Last reviewed (PT): {last_reviewed_display}")
 
     st.caption(f"Due score: {score:.2f}")
 
-    if link:
-        st.link_button("Open link", link)
+    if row.link:
+        st.link_button("Open link", row.link)
 
     notes_col_a, _notes_col_b = st.columns([1, 3])
     with notes_col_a:
-        if st.button("Show/Hide notes", key=f"review_toggle_notes_{qid}"):
+        if st.button("Show/Hide notes", key=f"review_toggle_notes_{row.id}"):
             st.session_state["review_show_notes"] = not st.session_state.get("review_show_notes")
 
     if st.session_state.get("review_show_notes"):
         edited_notes = st.text_area(
             "Notes",
-            value=(notes or ""),
+            value=(row.notes or ""),
             height=160,
             disabled=False,
-            key=f"review_notes_text_{qid}",
+            key=f"review_notes_text_{row.id}",
         )
 
-        if st.button("Save notes", key=f"review_save_notes_{qid}"):
-            if update_question(int(qid), notes=edited_notes):
+        if st.button("Save notes", key=f"review_save_notes_{row.id}"):
+            if update_question(row.id, notes=edited_notes):
                 st.success("Notes saved.")
             else:
                 st.error("Could not save notes.")
 
     if st.button("Reviewed", type="primary"):
-        if mark_reviewed(int(qid)):
-            st.success("Marked reviewed.")
-            st.session_state["review_candidate_id"] = None
-            st.rerun()
+        try:
+            reviewed = mark_reviewed(row.id)
+        except Exception as e:
+            st.error("Could not save the review; the database is not accepting writes.")
+            with st.expander("Error details"):
+                st.code(str(e))
         else:
-            st.error("Could not mark reviewed.")
+            if reviewed:
+                st.success("Marked reviewed.")
+                st.session_state["review_candidate_id"] = None
+                st.rerun()
+            else:
+                st.error("Could not mark reviewed.")
 
 st.divider()
 st.subheader("How picking works")
 st.markdown(
     """
-**New random**: picks any random question.
+**New random**: picks a random question, optionally limited to one difficulty.
 
 **Pick by ID**: loads a specific question by its numeric id.
 
-**Intelligent Pick 1 (due score only)**: computes a due score for every question and picks the highest.
+**Intelligent Pick 1 (most due)**: every question has a next due date, `last_reviewed + 2^times_reviewed` days. Picks the question whose due date is earliest; never-reviewed questions come first.
+
+**Intelligent Pick 2 (due + randomness)**: takes the 10 questions with the earliest due dates, then randomly picks one with probability weighted by due score (`days_since_last_reviewed / 2^times_reviewed`).
 
-**Intelligent Pick 2 (due score + randomness)**: computes due scores, takes the top 10 most-due questions, then randomly picks one with probability weighted by due score.
+**Weighted pick**: draws from the whole bank, with probability proportional to `due_score ^ (1 / temperature)`. Temperature 1 weights by due score; lower values concentrate on the most due questions, higher values spread picks out towards uniform.
 
-**Reviewed**: increments `times_reviewed` and sets `last_reviewed` to now.
+**Reviewed**: increments `times_reviewed`, sets `last_reviewed` to now and moves the next due date out accordingly.
 
 If a question has never been reviewed, we treat `days_since_last_reviewed` as a very large number so it gets prioritized.
 """
 )
+
+render_debug_panel(pool_stats(), page="review")
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Same cap as the next_due_at column: 2**20 days keeps dates in range.
+_MAX_INTERVAL_EXPONENT = 20
+
+
+def next_due_at(last_reviewed: datetime | None, times_reviewed: int | None) -> datetime | None:
+    """last_reviewed + 2**times_reviewed days, as the next_due_at column stores it; None if never reviewed."""
+    if last_reviewed is None:
+        return None
+    if last_reviewed.tzinfo is None:
+        last_reviewed = last_reviewed.replace(tzinfo=timezone.utc)
+    exponent = min(max(int(times_reviewed or 0), 0), _MAX_INTERVAL_EXPONENT)
+    return last_reviewed + timedelta(days=1 << exponent)
+
+
+class DueItem:
+    """One question's place in the review queue. Treat as read-only.
+
+    Uses __slots__ and computes its sort key once, since a queue holds one per question.
+    """
+
+    __slots__ = ("id", "last_reviewed", "times_reviewed", "due_at", "sort_key")
+
+    def __init__(self, question_id: int, last_reviewed: datetime | None, times_reviewed: int | None):
+        self.id = int(question_id)
+        self.last_reviewed = last_reviewed
+        self.times_reviewed = max(int(times_reviewed or 0), 0)
+        self.due_at = next_due_at(last_reviewed, self.times_reviewed)  # None: never reviewed, due first
+        # get_most_due() order: next_due_at NULLS FIRST, then id.
+        self.sort_key = (float("-inf") if self.due_at is None else self.due_at.timestamp(), self.id)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DueItem):
+            return NotImplemented
+        mine = (self.id, self.last_reviewed, self.times_reviewed)
+        return mine == (other.id, other.last_reviewed, other.times_reviewed)
+
+    def __repr__(self) -> str:
+        return f"DueItem(id={self.id!r}, due_at={self.due_at!r}, times_reviewed={self.times_reviewed!r})"
+
+
+class ReviewQueue:
+    """Questions ordered by next due date, kept in a heap and patched as reviews land.
+
+    Built once from the whole bank, then updated per question in O(log n):
+    a changed question gets a fresh heap entry and its old one is skipped
+    (lazy deletion) when it reaches the top. Reads take a loader,
+    `load(ids=None)` -> [(id, last_reviewed, times_reviewed)], used for the
+    first build and for questions marked stale by writes that don't report
+    their new review state.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._heap: list[tuple[tuple[float, int], int, DueItem]] = []
+        self._live: dict[int, DueItem] = {}
+        self._stale: set[int] = set()
+        self._loaded = False
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._live)
+
+    def get(self, question_id: int) -> DueItem | None:
+        """A question's queued state without loading anything; None if unknown or not loaded yet."""
+        with self._lock:
+            if int(question_id) in self._stale:
+                return None
+            return self._live.get(int(question_id))
+
+    def peek(self, load) -> DueItem | None:
+        """The most due question, left in the queue."""
+        with self._lock:
+            self._prepare(load)
+            return self._heap[0][2] if self._heap else None
+
+    def pop(self, load) -> DueItem | None:
+        """Removes and returns the most due question; it comes back on its next upsert or reload."""
+        with self._lock:
+            self._prepare(load)
+            if not self._heap:
+                return None
+            item = heapq.heappop(self._heap)[2]
+            del self._live[item.id]
+            self._drop_stale_top()
+            return item
+
+    def top_k(self, k: int, load) -> list[DueItem]:
+        """The k most due questions, most due first, left in the queue. O(k log n)."""
+        with self._lock:
+            self._prepare(load)
+            taken = []
+            while self._heap and len(taken) < k:
+                taken.append(heapq.heappop(self._heap))
+                self._drop_stale_top()
+            for entry in taken:
+                heapq.heappush(self._heap, entry)
+            return [entry[2] for entry in taken]
+
+    def upsert(self, question_id: int, last_reviewed: datetime | None, times_reviewed: int) -> None:
+        """Records a question's current review state. No-op until the queue is first loaded."""
+        with self._lock:
+            if not self._loaded:
+                return
+            item = DueItem(question_id, last_reviewed, times_reviewed)
+            self._stale.discard(item.id)
+            if self._live.get(item.id) == item:
+                return
+            self._live[item.id] = item
+            heapq.heappush(self._heap, (item.sort_key, next(self._seq), item))
+            self._compact_if_needed()
+
+    def discard(self, question_id: int) -> None:
+        with self._lock:
+            self._stale.discard(int(question_id))
+            if self._live.pop(int(question_id), None) is not None:
+                self._drop_stale_top()
+                self._compact_if_needed()
+
+    def mark_stale(self, question_ids=None) -> None:
+        """Reloads the given questions on the next read; None reloads the whole queue."""
+        with self._lock:
+            if question_ids is None:
+                self._loaded = False
+                self._heap, self._live, self._stale = [], {}, set()
+            elif self._loaded:
+                self._stale.update(int(question_id) for question_id in question_ids)
+
+    def _prepare(self, load) -> None:
+        # Loads while holding the lock, so writes that land meanwhile apply on top of it.
+        if not self._loaded:
+            items = [DueItem(*state) for state in load()]
+            self._live = {item.id: item for item in items}
+            self._heap = [(item.sort_key, next(self._seq), item) for item in self._live.values()]
+            heapq.heapify(self._heap)
+            self._stale.clear()
+            self._loaded = True
+        if self._stale:
+            stale, self._stale = list(self._stale), set()
+            found = {int(state[0]): state for state in load(stale)}
+            for question_id in stale:
+                if question_id in found:
+                    self.upsert(*found[question_id])
+                else:
+                    self.discard(question_id)
+
+    def _drop_stale_top(self) -> None:
+        heap = self._heap
+        while heap and self._live.get(heap[0][2].id) is not heap[0][2]:
+            heapq.heappop(heap)
+
+    def _compact_if_needed(self) -> None:
+        # Skipped entries only cost memory; rebuild once they outnumber live ones.
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [(item.sort_key, next(self._seq), item) for item in self._live.values()]
+            heapq.heapify(self._heap)
+        else:
+            self._drop_stale_top()
+
+
+_queue = ReviewQueue()
+
+
+def get_review_queue() -> ReviewQueue:
+    """The process-wide review queue."""
+    return _queue
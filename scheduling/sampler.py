@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .scoring import due_score, due_scores
+
+# Floor on a due score before weighting, so just-reviewed questions keep a sliver of weight.
+_MIN_SCORE = 0.0001
+# Temperatures outside this range behave like its ends; keeps the exponent finite.
+MIN_TEMPERATURE = 0.05
+MAX_TEMPERATURE = 100.0
+
+
+class FenwickTree:
+    """Prefix sums over float weights: O(log n) point updates and weighted draws."""
+
+    def __init__(self, weights):
+        self._n = len(weights)
+        tree = [0.0] + [float(w) for w in weights]
+        for i in range(1, self._n + 1):
+            parent = i + (i & -i)
+            if parent <= self._n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top_bit = 1 << (self._n.bit_length() - 1) if self._n else 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def add(self, index: int, delta: float) -> None:
+        i = index + 1
+        tree = self._tree
+        while i <= self._n:
+            tree[i] += delta
+            i += i & -i
+
+    def total(self) -> float:
+        i, total = self._n, 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, u: float) -> int:
+        """The index whose cumulative weight range contains u, for 0 <= u < total()."""
+        pos, step, tree = 0, self._top_bit, self._tree
+        while step:
+            nxt = pos + step
+            if nxt <= self._n and tree[nxt] <= u:
+                pos = nxt
+                u -= tree[nxt]
+            step >>= 1
+        return min(pos, self._n - 1)
+
+
+class DueSampler:
+    """Draws questions across the whole bank with probability ~ due_score ** (1 / temperature).
+
+    Temperature 1 samples proportionally to due score; towards 0 it approaches
+    always taking the most due question, and large values approach uniform.
+    Weights are due scores as of one reference time: a review reweights its
+    question in O(log n), and every `refresh_s` (or when the temperature
+    changes) the whole tree is rebuilt in O(n) so scores keep up with the clock.
+    Reads take the same loader as ReviewQueue, `load(ids=None)` ->
+    [(id, last_reviewed, times_reviewed)].
+    """
+
+    def __init__(self, *, refresh_s: float = 600.0):
+        self._lock = threading.RLock()
+        self._refresh_s = refresh_s
+        self._tree: FenwickTree | None = None
+        self._ids: list[int] = []
+        self._slots: dict[int, int] = {}
+        self._weights: list[float] = []
+        self._states: dict[int, tuple] = {}
+        self._stale: set[int] = set()
+        self._temperature = 1.0
+        self._as_of: datetime | None = None
+        self._built_at = 0.0
+        self._max_score = 1.0
+        self._needs_rebuild = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
+
+    def sample(self, load, *, temperature: float = 1.0, rng: random.Random | None = None) -> int | None:
+        """Returns one question id drawn by weight, or None when the bank is empty."""
+        temperature = min(max(float(temperature), MIN_TEMPERATURE), MAX_TEMPERATURE)
+        with self._lock:
+            if self._tree is None:
+                self._states = {int(state[0]): tuple(state[1:]) for state in load()}
+                self._stale.clear()
+                self._rebuild(temperature)
+            if self._stale:
+                stale, self._stale = list(self._stale), set()
+                found = {int(state[0]): state for state in load(stale)}
+                for question_id in stale:
+                    if question_id in found:
+                        self.upsert(*found[question_id])
+                    else:
+                        self.discard(question_id)
+            if (
+                self._needs_rebuild
+                or temperature != self._temperature
+                or time.monotonic() - self._built_at > self._refresh_s
+            ):
+                self._rebuild(temperature)
+
+            total = self._tree.total()
+            if total <= 0:
+                return None
+            index = self._tree.find((rng or random).random() * total)
+            if self._weights[index] <= 0:
+                # Float drift from many updates can land on an emptied slot; rebuild and retry once.
+                self._rebuild(temperature)
+                total = self._tree.total()
+                if total <= 0:
+                    return None
+                index = self._tree.find((rng or random).random() * total)
+            return self._ids[index]
+
+    def upsert(self, question_id: int, last_reviewed: datetime | None, times_reviewed: int) -> None:
+        """Reweights one question in O(log n). No-op until the sampler is first built."""
+        with self._lock:
+            if self._tree is None:
+                return
+            question_id = int(question_id)
+            self._stale.discard(question_id)
+            self._states[question_id] = (last_reviewed, times_reviewed)
+            slot = self._slots.get(question_id)
+            if slot is None:
+                # New questions need a slot: one O(n) rebuild at the next draw covers all of them.
+                self._needs_rebuild = True
+                return
+            weight = self._weight(due_score(last_reviewed, times_reviewed, now=self._as_of))
+            self._tree.add(slot, weight - self._weights[slot])
+            self._weights[slot] = weight
+
+    def discard(self, question_id: int) -> None:
+        with self._lock:
+            question_id = int(question_id)
+            self._stale.discard(question_id)
+            self._states.pop(question_id, None)
+            slot = self._slots.get(question_id)
+            if slot is not None and self._tree is not None:
+                self._tree.add(slot, -self._weights[slot])
+                self._weights[slot] = 0.0
+
+    def mark_stale(self, question_ids=None) -> None:
+        """Reloads the given questions on the next draw; None reloads everything."""
+        with self._lock:
+            if question_ids is None:
+                self._tree = None
+                self._states, self._stale = {}, set()
+            elif self._tree is not None:
+                self._stale.update(int(question_id) for question_id in question_ids)
+
+    def _weight(self, score: float) -> float:
+        # Relative to the build's top score so that small temperatures can't overflow.
+        return (max(score, _MIN_SCORE) / self._max_score) ** (1.0 / self._temperature)
+
+    def _rebuild(self, temperature: float) -> None:
+        self._needs_rebuild = False
+        self._temperature = temperature
+        self._as_of = datetime.now(timezone.utc)
+        self._built_at = time.monotonic()
+        self._ids = list(self._states)
+        self._slots = {question_id: slot for slot, question_id in enumerate(self._ids)}
+        states = list(self._states.values())
+        scores = np.maximum(
+            due_scores([s[0] for s in states], [s[1] for s in states], now=self._as_of), _MIN_SCORE
+        )
+        self._max_score = float(scores.max()) if len(scores) else 1.0
+        self._weights = ((scores / self._max_score) ** (1.0 / temperature)).tolist()
+        self._tree = FenwickTree(self._weights)
+
+
+_sampler = DueSampler()
+
+
+def get_due_sampler() -> DueSampler:
+    """The process-wide due-weighted sampler."""
+    return _sampler
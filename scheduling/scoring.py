@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Stand-in for "days since last review" when a question has never been reviewed,
+# so unreviewed questions rank ahead of everything else.
+NEVER_REVIEWED_DAYS = 10000.0
+
+
+def due_scores(last_reviewed, times_reviewed, *, now: datetime | None = None) -> np.ndarray:
+    """Scores every question in one pass: days since last review / 2**times_reviewed.
+
+    Higher means more due. `last_reviewed` may hold datetimes, ISO strings or
+    None; `times_reviewed` may hold ints or None. All rows share one `now`.
+    """
+    lr = pd.to_datetime(
+        pd.Series(last_reviewed, dtype=object), utc=True, errors="coerce", format="ISO8601"
+    )
+    now_ts = pd.Timestamp(now or datetime.now(timezone.utc))
+
+    days_since = (now_ts - lr).dt.total_seconds().to_numpy(dtype=float, na_value=np.nan) / 86400.0
+    days_since = np.where(np.isnan(days_since), NEVER_REVIEWED_DAYS, np.maximum(days_since, 0.0))
+
+    reviewed = pd.to_numeric(pd.Series(times_reviewed, dtype=object), errors="coerce")
+    reviewed = np.maximum(reviewed.fillna(0).to_numpy(dtype=float), 0.0)
+
+    return days_since / np.exp2(reviewed)
+
+
+def due_score(last_reviewed, times_reviewed, *, now: datetime | None = None) -> float:
+    if last_reviewed is None or isinstance(last_reviewed, datetime):
+        # Already parsed (e.g. a Question's field): plain arithmetic, no pandas round trip.
+        if last_reviewed is None:
+            days_since = NEVER_REVIEWED_DAYS
+        else:
+            if last_reviewed.tzinfo is None:
+                last_reviewed = last_reviewed.replace(tzinfo=timezone.utc)
+            elapsed = (now or datetime.now(timezone.utc)) - last_reviewed
+            days_since = max(elapsed.total_seconds() / 86400.0, 0.0)
+        try:
+            reviewed = max(int(times_reviewed or 0), 0)
+        except (TypeError, ValueError):
+            reviewed = 0
+        return days_since / 2.0**reviewed
+    return float(due_scores([last_reviewed], [times_reviewed], now=now)[0])
+
+
+def top_k(scores: np.ndarray, k: int, *, times_reviewed=None) -> np.ndarray:
+    """Positions of the k highest scores, best first, without sorting the whole array.
+
+    Ties keep input order; with `times_reviewed`, ties prefer fewer reviews.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+
+    keys = [candidates]
+    if times_reviewed is not None:
+        keys.append(np.asarray(times_reviewed, dtype=float)[candidates])
+    keys.append(-scores[candidates])
+    return candidates[np.lexsort(keys)][:k]
+
+
+def pick_most_due(ids, last_reviewed, times_reviewed, *, now: datetime | None = None):
+    """Returns (id, score) of the most due question, or (None, None) when empty."""
+    if len(ids) == 0:
+        return None, None
+
+    times = pd.to_numeric(pd.Series(times_reviewed, dtype=object), errors="coerce").fillna(0)
+    scores = due_scores(last_reviewed, times_reviewed, now=now)
+    best = top_k(scores, 1, times_reviewed=times.to_numpy(dtype=float))[0]
+    return ids[best], float(scores[best])
+
+
+def pick_due_with_randomness(
+    ids,
+    last_reviewed,
+    times_reviewed,
+    *,
+    k: int = 10,
+    now: datetime | None = None,
+    rng: random.Random | None = None,
+):
+    """Draws one of the k most due questions, weighted by due score."""
+    if len(ids) == 0:
+        return None, None
+
+    scores = due_scores(last_reviewed, times_reviewed, now=now)
+    top = top_k(scores, max(1, k))
+    weights = np.maximum(scores[top], 0.0001)
+    chosen = (rng or random).choices(list(top), weights=list(weights), k=1)[0]
+    return ids[chosen], float(scores[chosen])